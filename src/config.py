@@ -2,89 +2,144 @@
 Configuration management for OpenRouter MCP Server
 """
 
+import logging
 import os
-from typing import Dict, Any, Optional
-from dotenv import load_dotenv
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
+from dotenv import dotenv_values
 
-# Load environment variables
-load_dotenv()
+# .env is parsed a single time. Keys it sets are exported to os.environ unless
+# already set there (as load_dotenv(override=False) does), since libraries
+# read variables such as HTTPS_PROXY, NO_PROXY and SSL_CERT_FILE from there;
+# settings are then resolved once from a frozen snapshot of the environment
+def _load_env() -> Mapping[str, str]:
+    for key, value in dotenv_values().items():
+        if value is not None:
+            os.environ.setdefault(key, value)
+    return MappingProxyType(dict(os.environ))
+
+
+_ENV = _load_env()
+
+logger = logging.getLogger("openrouter-config")
 
 # Version and metadata
 VERSION = "1.0.0"
 MCP_VERSION = "1.0"
 
 # OpenRouter API Configuration
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+OPENROUTER_API_KEY = _ENV.get("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = _ENV.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 
 # Default model settings
-DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "moonshotai/kimi-k2-thinking")
-DEFAULT_TEMPERATURE = float(os.getenv("DEFAULT_TEMPERATURE", "0.7"))
-DEFAULT_MAX_TOKENS = int(os.getenv("DEFAULT_MAX_TOKENS", "8192"))
+DEFAULT_MODEL = _ENV.get("DEFAULT_MODEL", "moonshotai/kimi-k2-thinking")
+DEFAULT_TEMPERATURE = float(_ENV.get("DEFAULT_TEMPERATURE", "0.7"))
+DEFAULT_MAX_TOKENS = int(_ENV.get("DEFAULT_MAX_TOKENS", "8192"))
 DEFAULT_MAX_REASONING_TOKENS = int(
-    os.getenv("DEFAULT_MAX_REASONING_TOKENS", "16384")
+    _ENV.get("DEFAULT_MAX_REASONING_TOKENS", "16384")
 )  # Max thinking/reasoning tokens
 
 # Tool configuration
-ENABLE_WEB_SEARCH = os.getenv("ENABLE_WEB_SEARCH", "true").lower() == "true"
-FORCE_INTERNET_SEARCH = os.getenv("FORCE_INTERNET_SEARCH", "true").lower() == "true"
+ENABLE_WEB_SEARCH = _ENV.get("ENABLE_WEB_SEARCH", "true").lower() == "true"
+FORCE_INTERNET_SEARCH = _ENV.get("FORCE_INTERNET_SEARCH", "true").lower() == "true"
+
+# Reuse responses for identical requests (same model, messages and settings)
+RESPONSE_CACHE_ENABLED = _ENV.get("OPENROUTER_RESPONSE_CACHE", "false").lower() in (
+    "1",
+    "true",
+)
+RESPONSE_CACHE_MAX = int(_ENV.get("OPENROUTER_RESPONSE_CACHE_MAX", "256"))
+
+# Host home directory, used to map attached file paths into the container
+HOST_HOME = _ENV.get("HOST_HOME")
 
 # Logging configuration
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-LOG_FILE = os.getenv("LOG_FILE", "openrouter_mcp.log")
+LOG_LEVEL = _ENV.get("LOG_LEVEL", "INFO")
+LOG_FILE = _ENV.get("LOG_FILE", "openrouter_mcp.log")
 
 # Rate limiting
-RATE_LIMIT_REQUESTS_PER_MINUTE = int(os.getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "60"))
+RATE_LIMIT_REQUESTS_PER_MINUTE = int(_ENV.get("RATE_LIMIT_REQUESTS_PER_MINUTE", "60"))
 
 # MCP Transport limits
-MAX_MESSAGE_SIZE = int(os.getenv("MAX_MESSAGE_SIZE", "10485760"))  # 10MB
-MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "10"))
-
-# OpenRouter-specific model configurations
-PREFERRED_MODELS = {
-    "gemini-2.5-pro": "google/gemini-2.5-pro",
-    "gemini-pro": "google/gemini-2.5-pro",
-    "deepseek-r1": "deepseek/deepseek-r1-0528",
-    "deepseek": "deepseek/deepseek-r1-0528",
-    "deepseek-v3.1": "deepseek/deepseek-chat-v3.1",
-    "deepseek-chat-v3": "deepseek/deepseek-chat-v3.1",
-    "kimi-k2": "moonshotai/kimi-k2-0905",
-    "kimi": "moonshotai/kimi-k2-0905",
-    "grok-4": "x-ai/grok-code-fast-1",
-    "grok": "x-ai/grok-code-fast-1",
-    "qwen3-max": "qwen/qwen3-max",
-    "qwen-max": "qwen/qwen3-max",
-    "qwen3-coder-plus": "qwen/qwen3-coder-plus",
-    "qwen3-coder": "qwen/qwen3-coder-plus",
-    "qwen-coder": "qwen/qwen3-coder-plus",
-    "glm-4.6": "z-ai/glm-4.6",
-    "glm": "z-ai/glm-4.6",
-    "gpt-5": "openai/gpt-5",
-    "openai-gpt-5": "openai/gpt-5",
-}
+MAX_MESSAGE_SIZE = int(_ENV.get("MAX_MESSAGE_SIZE", "10485760"))  # 10MB
+MAX_CONCURRENT_REQUESTS = int(_ENV.get("MAX_CONCURRENT_REQUESTS", "10"))
+
+# Cap on prompt plus attached file text; files beyond it are truncated or omitted
+MAX_PROMPT_BYTES = int(_ENV.get("OPENROUTER_MAX_PROMPT_BYTES", str(1 << 20)))
+
+# OpenRouter call limits: concurrent completions, and retries on 429/5xx
+OPENROUTER_MAX_CONCURRENCY = int(_ENV.get("OPENROUTER_MAX_CONCURRENCY", "8"))
+OPENROUTER_MAX_RETRIES = int(_ENV.get("OPENROUTER_MAX_RETRIES", "3"))
+
+# Conversation storage
+CONV_CACHE_MAX = int(_ENV.get("CONV_CACHE_MAX", "256"))  # Conversations kept in memory
+
+# OpenRouter-specific model configurations (read-only lookup tables)
+PREFERRED_MODELS = MappingProxyType(
+    {
+        "gemini-2.5-pro": "google/gemini-2.5-pro",
+        "gemini-pro": "google/gemini-2.5-pro",
+        "deepseek-r1": "deepseek/deepseek-r1-0528",
+        "deepseek": "deepseek/deepseek-r1-0528",
+        "deepseek-v3.1": "deepseek/deepseek-chat-v3.1",
+        "deepseek-chat-v3": "deepseek/deepseek-chat-v3.1",
+        "kimi-k2": "moonshotai/kimi-k2-0905",
+        "kimi": "moonshotai/kimi-k2-0905",
+        "grok-4": "x-ai/grok-code-fast-1",
+        "grok": "x-ai/grok-code-fast-1",
+        "qwen3-max": "qwen/qwen3-max",
+        "qwen-max": "qwen/qwen3-max",
+        "qwen3-coder-plus": "qwen/qwen3-coder-plus",
+        "qwen3-coder": "qwen/qwen3-coder-plus",
+        "qwen-coder": "qwen/qwen3-coder-plus",
+        "glm-4.6": "z-ai/glm-4.6",
+        "glm": "z-ai/glm-4.6",
+        "gpt-5": "openai/gpt-5",
+        "openai-gpt-5": "openai/gpt-5",
+    }
+)
 
 # Model capabilities configuration
-MODEL_CAPABILITIES = {
-    "vision": ["google/gemini-2.5-pro", "openai/gpt-5"],
-    "function_calling": ["google/gemini-2.5-pro", "openai/gpt-5"],
-    "large_context": [
-        "deepseek/deepseek-r1-0528",
-        "deepseek/deepseek-chat-v3.1",
-        "google/gemini-2.5-pro",
-        "moonshotai/kimi-k2-0905",
-        "x-ai/grok-code-fast-1",
-        "qwen/qwen3-max",
-        "qwen/qwen3-coder-plus",
-        "z-ai/glm-4.6",
-        "openai/gpt-5",
-    ],
-    "internet_access": ["google/gemini-2.5-pro"],
+MODEL_CAPABILITIES = MappingProxyType(
+    {
+        "vision": frozenset({"google/gemini-2.5-pro", "openai/gpt-5"}),
+        "function_calling": frozenset({"google/gemini-2.5-pro", "openai/gpt-5"}),
+        "large_context": frozenset(
+            {
+                "deepseek/deepseek-r1-0528",
+                "deepseek/deepseek-chat-v3.1",
+                "google/gemini-2.5-pro",
+                "moonshotai/kimi-k2-0905",
+                "x-ai/grok-code-fast-1",
+                "qwen/qwen3-max",
+                "qwen/qwen3-coder-plus",
+                "z-ai/glm-4.6",
+                "openai/gpt-5",
+            }
+        ),
+        "internet_access": frozenset({"google/gemini-2.5-pro"}),
+    }
+)
+
+# PREFERRED_MODELS keyed by lowercased alias, for case-insensitive matching
+_ALIASES_CI = {alias.lower(): model for alias, model in PREFERRED_MODELS.items()}
+
+# Inverse of MODEL_CAPABILITIES: model -> capabilities, for O(1) membership tests
+_MODEL_CAPS: Dict[str, frozenset] = {
+    model: frozenset(
+        capability
+        for capability, models in MODEL_CAPABILITIES.items()
+        if model in models
+    )
+    for model in {m for models in MODEL_CAPABILITIES.values() for m in models}
 }
 
 
-def get_config() -> Dict[str, Any]:
-    """Get current configuration as dictionary"""
-    return {
+def _build_config() -> Mapping[str, Any]:
+    """Build the read-only configuration snapshot served by get_config()"""
+    config = {
         "version": VERSION,
         "mcp_version": MCP_VERSION,
         "openrouter": {
@@ -100,6 +155,8 @@ def get_config() -> Dict[str, Any]:
         "tools": {
             "web_search": ENABLE_WEB_SEARCH,
             "force_internet_search": FORCE_INTERNET_SEARCH,
+            "response_cache": RESPONSE_CACHE_ENABLED,
+            "response_cache_max": RESPONSE_CACHE_MAX,
         },
         "logging": {
             "level": LOG_LEVEL,
@@ -111,22 +168,46 @@ def get_config() -> Dict[str, Any]:
         "transport": {
             "max_message_size": MAX_MESSAGE_SIZE,
             "max_concurrent_requests": MAX_CONCURRENT_REQUESTS,
+            "max_prompt_bytes": MAX_PROMPT_BYTES,
+            "openrouter_max_concurrency": OPENROUTER_MAX_CONCURRENCY,
+            "openrouter_max_retries": OPENROUTER_MAX_RETRIES,
+        },
+        "storage": {
+            "conversation_cache_max": CONV_CACHE_MAX,
         },
     }
+    # Sections are wrapped too, so the shared snapshot cannot be edited in place
+    return MappingProxyType(
+        {
+            key: MappingProxyType(value) if isinstance(value, dict) else value
+            for key, value in config.items()
+        }
+    )
+
+
+# Every value is fixed at import, so the snapshot is built once
+_CONFIG = _build_config()
+
+
+def get_config() -> Mapping[str, Any]:
+    """Get current configuration as a read-only mapping"""
+    return _CONFIG
 
 
 def validate_config() -> bool:
     """Validate configuration and return True if valid"""
     if not OPENROUTER_API_KEY:
-        print("ERROR: OPENROUTER_API_KEY is required")
+        logger.error("OPENROUTER_API_KEY is required")
         return False
 
     if DEFAULT_TEMPERATURE < 0 or DEFAULT_TEMPERATURE > 2:
-        print("ERROR: DEFAULT_TEMPERATURE must be between 0 and 2")
+        logger.error(
+            "DEFAULT_TEMPERATURE must be between 0 and 2, got %s", DEFAULT_TEMPERATURE
+        )
         return False
 
     if DEFAULT_MAX_TOKENS < 1:
-        print("ERROR: DEFAULT_MAX_TOKENS must be positive")
+        logger.error("DEFAULT_MAX_TOKENS must be positive, got %s", DEFAULT_MAX_TOKENS)
         return False
 
     return True
@@ -137,119 +218,184 @@ def get_model_alias(model_name: str, user_prompt: str = "") -> str:
     if not model_name:
         return DEFAULT_MODEL
 
-    # Direct alias match first
-    if model_name in PREFERRED_MODELS:
-        return PREFERRED_MODELS[model_name]
-
-    # If it's already a full OpenRouter model name, return as-is
-    if "/" in model_name and model_name not in PREFERRED_MODELS:
+    # If it's already a full OpenRouter model name, return as-is (no alias
+    # contains "/", so this cannot shadow one)
+    if "/" in model_name:
         return model_name
 
+    # Direct alias match, exact first and then ignoring case ("Qwen3-Coder")
+    model = PREFERRED_MODELS.get(model_name) or _ALIASES_CI.get(model_name.lower())
+    if model is not None:
+        return model
+
     # Use LLM intelligence to determine the best model based on user query
     return _intelligent_model_selection(model_name, user_prompt)
 
 
+# Model capabilities for intelligent selection
+_MODEL_INFO = {
+    "gemini-2.5-pro": {
+        "model": "google/gemini-2.5-pro",
+        "strengths": "vision, web search, general reasoning, large context (1M+ tokens)",
+        "best_for": "image analysis, current information, research, general tasks",
+    },
+    "deepseek-r1": {
+        "model": "deepseek/deepseek-r1-0528",
+        "strengths": "advanced reasoning, logical analysis, problem solving",
+        "best_for": "complex reasoning, mathematical problems, logical analysis",
+    },
+    "deepseek-v3.1": {
+        "model": "deepseek/deepseek-chat-v3.1",
+        "strengths": "latest version with 163K context, advanced chat capabilities",
+        "best_for": "general chat, latest features, large context tasks",
+    },
+    "kimi-k2": {
+        "model": "moonshotai/kimi-k2-0905",
+        "strengths": "advanced reasoning, programming, large context",
+        "best_for": "programming tasks, code analysis, advanced reasoning",
+    },
+    "grok-4": {
+        "model": "x-ai/grok-code-fast-1",
+        "strengths": "fast code generation, programming tasks, technical solutions",
+        "best_for": "code generation, debugging, programming assistance, technical tasks",
+    },
+    "qwen3-max": {
+        "model": "qwen/qwen3-max",
+        "strengths": "large context (128K), general reasoning, multilingual",
+        "best_for": "large document analysis, general tasks, multilingual content",
+    },
+    "qwen3-coder-plus": {
+        "model": "qwen/qwen3-coder-plus",
+        "strengths": "coding, programming, technical tasks (32K context)",
+        "best_for": "code generation, debugging, programming assistance",
+    },
+    "glm-4.6": {
+        "model": "z-ai/glm-4.6",
+        "strengths": "balanced performance, general tasks, good default choice",
+        "best_for": "general purpose tasks, balanced performance",
+    },
+    "gpt-5": {
+        "model": "openai/gpt-5",
+        "strengths": "flagship model with 400K context, latest capabilities",
+        "best_for": "cutting-edge performance, large context tasks, latest features",
+    },
+}
+
+# Model families recognised in a request, in priority order:
+# regex group -> (keywords, _MODEL_INFO entry)
+_MODEL_FAMILIES = {
+    "gemini": (("gemini", "google"), "gemini-2.5-pro"),
+    "deepseek": (("deepseek",), "deepseek-r1"),
+    "kimi": (("kimi", "moonshot"), "kimi-k2"),
+    "grok": (("grok", "x-ai", "xai"), "grok-4"),
+    "glm": (("glm", "z-ai"), "glm-4.6"),
+    "gpt5": (("gpt-5", "gpt5", "openai"), "gpt-5"),
+    "qwen": (("qwen",), "qwen3-max"),
+}
+_MODEL_FAMILY_RE = re.compile(
+    "|".join(
+        f"(?P<{family}>{'|'.join(map(re.escape, keywords))})"
+        for family, (keywords, _) in _MODEL_FAMILIES.items()
+    )
+)
+_MODEL_FAMILY_PRIORITY = {family: i for i, family in enumerate(_MODEL_FAMILIES)}
+_DEEPSEEK_V3_RE = re.compile(r"v3\.1|v3|chat|latest")
+
+
+def _check_model_routing():
+    """Fail at import if the routing tables disagree about a model
+
+    Catches aliases that collide once lowercased and family targets that
+    resolve differently from the alias of the same name, either of which
+    would otherwise route requests to the wrong model without any error.
+    """
+    seen: Dict[str, str] = {}
+    for alias, model in PREFERRED_MODELS.items():
+        other = seen.setdefault(alias.lower(), model)
+        if other != model:
+            raise ValueError(
+                f"Alias {alias!r} collides case-insensitively: {other} vs {model}"
+            )
+
+    for info_key, info in _MODEL_INFO.items():
+        alias_model = PREFERRED_MODELS.get(info_key, info["model"])
+        if alias_model != info["model"]:
+            raise ValueError(
+                f"Model family {info_key!r} routes to {info['model']} "
+                f"but the alias resolves to {alias_model}"
+            )
+
+    for family, (_, info_key) in _MODEL_FAMILIES.items():
+        if info_key not in _MODEL_INFO:
+            raise ValueError(f"Model family {family!r} has no entry {info_key!r}")
+
+
+_check_model_routing()
+
+
+# Coding intent in a prompt picks the qwen coder variant. Keywords must start a
+# word ("debugging" counts, "encode" does not), and one case-insensitive search
+# avoids lowercasing a possibly large prompt
+_CODING_PROMPT_RE = re.compile(
+    r"\b(?:code|programming|debug|function|script|development)", re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=512)
+def _match_model_family(model_request: str) -> Optional[str]:
+    """Return the _MODEL_INFO key for the model family named in a request
+
+    Cached on the request alone: clients repeat the same few model names, while
+    the prompt (only consulted for qwen) differs on every call.
+    """
+    request_lower = model_request.lower().strip()
+
+    # One pass over the request finds every family mentioned; the earliest one
+    # in _MODEL_FAMILIES wins, as in the original if/elif order
+    families = {match.lastgroup for match in _MODEL_FAMILY_RE.finditer(request_lower)}
+    if not families:
+        return None
+    family = min(families, key=_MODEL_FAMILY_PRIORITY.__getitem__)
+
+    # Check for deepseek version preference
+    if family == "deepseek" and _DEEPSEEK_V3_RE.search(request_lower):
+        return "deepseek-v3.1"
+    # An explicit coder request ("Qwen Coder") must not fall back to qwen3-max
+    if family == "qwen" and "coder" in request_lower:
+        return "qwen3-coder-plus"
+    return _MODEL_FAMILIES[family][1]
+
+
 def _intelligent_model_selection(model_request: str, user_prompt: str = "") -> str:
     """Use LLM intelligence to select the best model based on context"""
+    info_key = _match_model_family(model_request)
+    if info_key is None:
+        # If no match found, return the request as-is (assume it's a full model name)
+        return model_request
 
-    # Model capabilities for intelligent selection
-    model_info = {
-        "gemini-2.5-pro": {
-            "model": "google/gemini-2.5-pro",
-            "strengths": "vision, web search, general reasoning, large context (1M+ tokens)",
-            "best_for": "image analysis, current information, research, general tasks",
-        },
-        "deepseek-r1": {
-            "model": "deepseek/deepseek-r1-0528",
-            "strengths": "advanced reasoning, logical analysis, problem solving",
-            "best_for": "complex reasoning, mathematical problems, logical analysis",
-        },
-        "deepseek-v3.1": {
-            "model": "deepseek/deepseek-chat-v3.1",
-            "strengths": "latest version with 163K context, advanced chat capabilities",
-            "best_for": "general chat, latest features, large context tasks",
-        },
-        "kimi-k2": {
-            "model": "moonshotai/kimi-k2-0905",
-            "strengths": "advanced reasoning, programming, large context",
-            "best_for": "programming tasks, code analysis, advanced reasoning",
-        },
-        "grok-4": {
-            "model": "x-ai/grok-code-fast-1",
-            "strengths": "fast code generation, programming tasks, technical solutions",
-            "best_for": "code generation, debugging, programming assistance, technical tasks",
-        },
-        "qwen3-max": {
-            "model": "qwen/qwen3-max",
-            "strengths": "large context (128K), general reasoning, multilingual",
-            "best_for": "large document analysis, general tasks, multilingual content",
-        },
-        "qwen3-coder-plus": {
-            "model": "qwen/qwen3-coder-plus",
-            "strengths": "coding, programming, technical tasks (32K context)",
-            "best_for": "code generation, debugging, programming assistance",
-        },
-        "glm-4.6": {
-            "model": "z-ai/glm-4.6",
-            "strengths": "balanced performance, general tasks, good default choice",
-            "best_for": "general purpose tasks, balanced performance",
-        },
-        "gpt-5": {
-            "model": "openai/gpt-5",
-            "strengths": "flagship model with 400K context, latest capabilities",
-            "best_for": "cutting-edge performance, large context tasks, latest features",
-        },
-    }
+    # For qwen, use context to determine which variant
+    if info_key == "qwen3-max" and user_prompt:
+        if _CODING_PROMPT_RE.search(user_prompt):
+            return _MODEL_INFO["qwen3-coder-plus"]["model"]
 
-    # Simple intelligent matching based on request context
-    request_lower = model_request.lower().strip()
-    prompt_lower = user_prompt.lower() if user_prompt else ""
-
-    # Direct name matching with intelligence
-    if "gemini" in request_lower or "google" in request_lower:
-        return model_info["gemini-2.5-pro"]["model"]
-    elif "deepseek" in request_lower:
-        # Check for version preference
-        if any(word in request_lower for word in ["v3.1", "v3", "chat", "latest"]):
-            return model_info["deepseek-v3.1"]["model"]
-        else:
-            return model_info["deepseek-r1"]["model"]
-    elif "kimi" in request_lower or "moonshot" in request_lower:
-        return model_info["kimi-k2"]["model"]
-    elif "grok" in request_lower or "x-ai" in request_lower or "xai" in request_lower:
-        return model_info["grok-4"]["model"]
-    elif "glm" in request_lower or "z-ai" in request_lower:
-        return model_info["glm-4.6"]["model"]
-    elif (
-        "gpt-5" in request_lower or "gpt5" in request_lower or "openai" in request_lower
-    ):
-        return model_info["gpt-5"]["model"]
+    return _MODEL_INFO[info_key]["model"]
+
+
+def list_available_aliases() -> Mapping[str, str]:
+    """List all available model aliases and their mappings (read-only view)"""
+    return PREFERRED_MODELS
 
-    # For qwen, use context to determine which variant
-    elif "qwen" in request_lower:
-        # Analyze user prompt to determine best qwen variant
-        if any(
-            word in prompt_lower
-            for word in [
-                "code",
-                "programming",
-                "debug",
-                "function",
-                "script",
-                "development",
-            ]
-        ):
-            return model_info["qwen3-coder-plus"]["model"]
-        else:
-            return model_info["qwen3-max"]["model"]
-
-    # If no match found, return the request as-is (assume it's a full model name)
-    return model_request
-
-
-def list_available_aliases() -> dict:
-    """List all available model aliases and their mappings"""
-    return PREFERRED_MODELS.copy()
+
+# Aliases in suggestion order, with their lowercased form for matching
+_SORTED_ALIASES = tuple((alias.lower(), alias) for alias in sorted(PREFERRED_MODELS))
+
+
+@lru_cache(maxsize=256)
+def _matching_aliases(partial_lower: str) -> tuple:
+    """Aliases containing partial_lower, already in sorted order"""
+    return tuple(
+        alias for alias_lower, alias in _SORTED_ALIASES if partial_lower in alias_lower
+    )
 
 
 def suggest_model_alias(partial_name: str) -> list:
@@ -257,22 +403,18 @@ def suggest_model_alias(partial_name: str) -> list:
     if not partial_name:
         return []
 
-    partial_lower = partial_name.lower()
-    suggestions = []
-
-    for alias in PREFERRED_MODELS.keys():
-        if partial_lower in alias.lower():
-            suggestions.append(alias)
-
-    return sorted(suggestions)
+    # The cache holds tuples; callers still get their own list
+    return list(_matching_aliases(partial_name.lower()))
 
 
+@lru_cache(maxsize=512)
 def has_capability(model_name: str, capability: str) -> bool:
     """Check if a model has a specific capability"""
     actual_model = get_model_alias(model_name)
-    return actual_model in MODEL_CAPABILITIES.get(capability, [])
+    return capability in _MODEL_CAPS.get(actual_model, ())
 
 
+@lru_cache(maxsize=512)
 def should_force_internet_search(model_name: str) -> bool:
     """Check if we should force internet search for this model"""
     if not FORCE_INTERNET_SEARCH:
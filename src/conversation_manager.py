@@ -5,89 +5,311 @@ Conversation History Manager for OpenRouter MCP Server
 Handles conversation continuation with UUID tags to maintain chat history
 across multiple tool calls.
 """
-import json
 import os
+import sqlite3
+import threading
+import time
 import uuid
-from typing import Dict, List, Optional, Any
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime
 import logging
 
+import orjson
+
 logger = logging.getLogger("conversation-manager")
 
+# Bumped whenever the index schema changes; an older index is rebuilt
+INDEX_VERSION = 2
+# Characters of the last message kept in the index for listings
+PREVIEW_CHARS = 200
+
 
 class ConversationManager:
     """Manages conversation history with UUID-based continuation"""
 
-    def __init__(self, storage_dir: str = "/tmp/openrouter_conversations"):
+    # Storage directories already verified writable in this process
+    _dirs_checked: Set[str] = set()
+
+    def __init__(
+        self,
+        storage_dir: str = "/tmp/openrouter_conversations",
+        cache_max: int = 256,
+    ):
         """Initialize conversation manager
 
         Args:
             storage_dir: Directory to store conversation files
+            cache_max: Maximum number of conversations kept in memory
         """
         self.storage_dir = storage_dir
         self.ensure_storage_dir()
-        # In-memory cache for active conversations (following best practices)
-        self._conversation_cache = {}
+        # LRU cache of active conversations; evicted ones are reloaded from disk
+        self._conversation_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_max = max(cache_max, 1)
+        # Guards the cache's ordering and eviction; messages are appended from
+        # worker threads while the event loop thread reads
+        self._cache_lock = threading.Lock()
+        # Per cached conversation: OpenAI-format messages and running char totals
+        self._history: Dict[str, Tuple[List[Dict[str, str]], List[int]]] = {}
+        # Serializes appends per conversation so concurrent writers don't interleave
+        self._locks: Dict[str, threading.Lock] = {}
+        # Summary index so listings don't have to parse every conversation
+        self._index = self._open_index()
 
     def ensure_storage_dir(self):
         """Ensure storage directory exists"""
         try:
             os.makedirs(self.storage_dir, exist_ok=True)
-            logger.info(f"STORAGE: Conversation storage directory: {self.storage_dir}")
+            if self.storage_dir in self._dirs_checked:
+                return
+            logger.info("STORAGE: Conversation storage directory: %s", self.storage_dir)
 
-            # Test write access
+            # Test write access once per directory per process
             test_file = os.path.join(self.storage_dir, "test_write.tmp")
             with open(test_file, "w") as f:
                 f.write("test")
             os.remove(test_file)
-            logger.info(f"STORAGE: Directory is writable: {self.storage_dir}")
+            self._dirs_checked.add(self.storage_dir)
+            logger.info("STORAGE: Directory is writable: %s", self.storage_dir)
         except Exception as e:
             logger.error(
-                f"STORAGE: Failed to create or write to storage directory {self.storage_dir}: {e}"
+                "STORAGE: Failed to create or write to storage directory %s: %s",
+                self.storage_dir,
+                e,
             )
             raise
 
+    def _open_index(self) -> sqlite3.Connection:
+        """Open the summary index, rebuilding it from disk if it is missing
+
+        The conversation files stay the source of truth; the index only
+        mirrors what list_conversations needs.
+        """
+        index_path = os.path.join(self.storage_dir, "index.db")
+        is_new = not os.path.exists(index_path)
+        conn = sqlite3.connect(
+            index_path, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            conn.execute("DROP TABLE IF EXISTS conversations")
+            conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            is_new = True
+        conn.execute("""CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                created_at TEXT,
+                updated_at TEXT,
+                message_count INTEGER NOT NULL,
+                last_message_preview TEXT
+            )""")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS conversations_updated_at"
+            " ON conversations (updated_at)"
+        )
+        # Set before the rebuild, since migrating a legacy file indexes it
+        self._index = conn
+        if is_new:
+            self._rebuild_index(conn)
+        else:
+            self._migrate_legacy_conversations()
+        return conn
+
+    def _rebuild_index(self, conn: sqlite3.Connection):
+        """Populate the index from the conversation files on disk"""
+        count = 0
+        for continuation_id, _ in self._scan_conversations():
+            conversation_data = self._read_conversation(continuation_id)
+            if conversation_data:
+                self._index_put(conversation_data, conn)
+                count += 1
+        logger.info("STORAGE: Rebuilt conversation index with %d entries", count)
+
+    def _migrate_legacy_conversations(self):
+        """Convert and index conversations still in the single-file format"""
+        count = 0
+        for continuation_id, entry in self._scan_conversations():
+            if entry.name.endswith(".json"):
+                if self._read_conversation(continuation_id):
+                    count += 1
+        if count:
+            logger.info("STORAGE: Migrated %d legacy conversations", count)
+
+    def _scan_conversations(self) -> List[Tuple[str, os.DirEntry]]:
+        """List (conversation id, DirEntry) for every conversation on disk
+
+        That is each message log, plus each legacy conversation_<id>.json not
+        yet converted to one.
+        """
+        logs = {}
+        legacy = {}
+        with os.scandir(self.storage_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.startswith("conversation_"):
+                    continue
+                if name.endswith(".jsonl"):
+                    logs[name[13:-6]] = entry  # Strip "conversation_" and ".jsonl"
+                elif name.endswith(".json") and not name.endswith(".meta.json"):
+                    legacy[name[13:-5]] = entry
+        legacy.update(logs)
+        return list(legacy.items())
+
+    def _index_put(
+        self,
+        conversation_data: Dict[str, Any],
+        conn: Optional[sqlite3.Connection] = None,
+    ):
+        """Insert or refresh a conversation's row in the index"""
+        messages = conversation_data.get("messages", [])
+        try:
+            (conn or self._index).execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?)",
+                (
+                    conversation_data["id"],
+                    conversation_data.get("created_at"),
+                    conversation_data.get("updated_at"),
+                    len(messages),
+                    self._preview(messages),
+                ),
+            )
+        except sqlite3.Error as e:
+            logger.error(
+                "STORAGE: Error indexing conversation %s: %s",
+                conversation_data["id"],
+                e,
+            )
+
+    @staticmethod
+    def _preview(messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Start of the last message's content, for listings"""
+        return messages[-1]["content"][:PREVIEW_CHARS] if messages else None
+
+    def _cache_get(self, continuation_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached conversation, marking it most recently used"""
+        with self._cache_lock:
+            conversation_data = self._conversation_cache.get(continuation_id)
+            if conversation_data is not None:
+                self._conversation_cache.move_to_end(continuation_id)
+            return conversation_data
+
+    def _cache_put(self, continuation_id: str, conversation_data: Dict[str, Any]):
+        """Cache a conversation, evicting the least recently used over the limit"""
+        with self._cache_lock:
+            self._conversation_cache[continuation_id] = conversation_data
+            self._conversation_cache.move_to_end(continuation_id)
+            while len(self._conversation_cache) > self._cache_max:
+                evicted_id, _ = self._conversation_cache.popitem(last=False)
+                self._history.pop(evicted_id, None)
+
+    def _get_lock(self, continuation_id: str) -> threading.Lock:
+        """Get the lock guarding writes to one conversation"""
+        return self._locks.setdefault(continuation_id, threading.Lock())
+
     def get_conversation_file(self, continuation_id: str) -> str:
-        """Get file path for conversation
+        """Get file path for conversation messages
+
+        Messages are stored one JSON object per line and only ever appended.
 
         Args:
             continuation_id: UUID of the conversation
 
         Returns:
-            File path for the conversation
+            File path for the conversation messages (JSONL)
         """
+        return os.path.join(self.storage_dir, f"conversation_{continuation_id}.jsonl")
+
+    def get_legacy_file(self, continuation_id: str) -> str:
+        """Get file path of a conversation in the old single-file JSON format"""
         return os.path.join(self.storage_dir, f"conversation_{continuation_id}.json")
 
+    def get_metadata_file(self, continuation_id: str) -> str:
+        """Get file path for conversation metadata
+
+        Args:
+            continuation_id: UUID of the conversation
+
+        Returns:
+            File path for the conversation metadata (id and timestamps)
+        """
+        return os.path.join(
+            self.storage_dir, f"conversation_{continuation_id}.meta.json"
+        )
+
+    @staticmethod
+    def _replace_file(file_path: str, chunks):
+        """Write chunks to a temp file, then rename it over file_path
+
+        Readers and crashes see either the old file or the new one, never a
+        truncated one.
+        """
+        tmp_path = f"{file_path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.writelines(chunks)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_metadata(self, conversation_data: Dict[str, Any]):
+        """Write the metadata file (everything except the messages)"""
+        metadata = {k: v for k, v in conversation_data.items() if k != "messages"}
+        self._replace_file(
+            self.get_metadata_file(conversation_data["id"]), [orjson.dumps(metadata)]
+        )
+
+    def _write_messages(self, file_path: str, messages: List[Dict[str, Any]]):
+        """Rewrite a message log from scratch"""
+        self._replace_file(
+            file_path,
+            (
+                orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE)
+                for message in messages
+            ),
+        )
+
     def create_conversation(self) -> str:
         """Create a new conversation
 
         Returns:
             New conversation UUID
         """
-        continuation_id = str(uuid.uuid4())
+        continuation_id = uuid.uuid4().hex
+        created_at = datetime.utcnow().isoformat()
         conversation_data = {
             "id": continuation_id,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": created_at,
+            # Set from the start so listings can always sort on it
+            "updated_at": created_at,
             "messages": [],
         }
 
         file_path = self.get_conversation_file(continuation_id)
-        logger.debug(f"STORAGE: Creating conversation file: {file_path}")
+        logger.debug("STORAGE: Creating conversation file: %s", file_path)
 
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(conversation_data, f, indent=2)
+            # Empty message log plus its metadata
+            open(file_path, "wb").close()
+            self._write_metadata(conversation_data)
 
             # Add to cache
-            self._conversation_cache[continuation_id] = conversation_data
+            self._cache_put(continuation_id, conversation_data)
+            self._index_put(conversation_data)
 
-            logger.info(f"STORAGE: Created new conversation: {continuation_id}")
+            logger.info("STORAGE: Created new conversation: %s", continuation_id)
             logger.debug(
-                f"STORAGE: Conversation file created successfully at: {file_path}"
+                "STORAGE: Conversation file created successfully at: %s", file_path
             )
             return continuation_id
         except Exception as e:
-            logger.error(f"STORAGE: Error creating conversation {continuation_id}: {e}")
+            logger.error(
+                "STORAGE: Error creating conversation %s: %s", continuation_id, e
+            )
             raise
 
     def load_conversation(self, continuation_id: str) -> Optional[Dict[str, Any]]:
@@ -100,35 +322,101 @@ class ConversationManager:
             Conversation data or None if not found
         """
         # Check in-memory cache first (best practice)
-        if continuation_id in self._conversation_cache:
-            logger.debug(f"STORAGE: Loading conversation {continuation_id} from cache")
-            cached_data = self._conversation_cache[continuation_id]
+        cached_data = self._cache_get(continuation_id)
+        if cached_data is not None:
+            logger.debug("STORAGE: Loading conversation %s from cache", continuation_id)
             logger.debug(
-                f"STORAGE: Cached conversation has {len(cached_data.get('messages', []))} messages"
+                "STORAGE: Cached conversation has %d messages",
+                len(cached_data.get("messages", [])),
             )
             return cached_data
 
+        conversation_data = self._read_conversation(continuation_id)
+        if conversation_data is not None:
+            # Cache the loaded conversation
+            self._cache_put(continuation_id, conversation_data)
+        return conversation_data
+
+    def _read_conversation(self, continuation_id: str) -> Optional[Dict[str, Any]]:
+        """Read a conversation from disk, bypassing the cache"""
         file_path = self.get_conversation_file(continuation_id)
-        logger.debug(f"STORAGE: Attempting to load conversation from file: {file_path}")
+        logger.debug(
+            "STORAGE: Attempting to load conversation from file: %s", file_path
+        )
 
         if not os.path.exists(file_path):
-            logger.warning(f"STORAGE: Conversation file not found: {file_path}")
+            if os.path.exists(self.get_legacy_file(continuation_id)):
+                return self._migrate_legacy_file(continuation_id)
+            logger.warning("STORAGE: Conversation file not found: %s", file_path)
             return None
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                conversation_data = json.load(f)
+            with open(self.get_metadata_file(continuation_id), "rb") as f:
+                conversation_data = orjson.loads(f.read())
+
+            messages = []
+            torn = False
+            with open(file_path, "rb") as f:
+                for line in f:
+                    try:
+                        messages.append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        torn = True
+            if torn:
+                # A torn line from an interrupted append; rewrite the log so the
+                # next append does not land on the same line
+                logger.warning(
+                    "STORAGE: Dropped unreadable message lines in %s", file_path
+                )
+                self._write_messages(file_path, messages)
+            conversation_data["messages"] = messages
 
-            # Cache the loaded conversation
-            self._conversation_cache[continuation_id] = conversation_data
             logger.debug(
-                f"STORAGE: Loaded conversation {continuation_id} with {len(conversation_data.get('messages', []))} messages from file"
+                "STORAGE: Loaded conversation %s with %d messages from file",
+                continuation_id,
+                len(conversation_data.get("messages", [])),
             )
             return conversation_data
         except Exception as e:
-            logger.error(f"STORAGE: Error loading conversation {continuation_id}: {e}")
+            logger.error(
+                "STORAGE: Error loading conversation %s: %s", continuation_id, e
+            )
             return None
 
+    def _migrate_legacy_file(self, continuation_id: str) -> Optional[Dict[str, Any]]:
+        """Convert a conversation_<id>.json into a message log plus metadata
+
+        The metadata is written first and the log last, so an interrupted
+        migration leaves no log behind and is simply redone on the next read.
+        """
+        legacy_path = self.get_legacy_file(continuation_id)
+        try:
+            with open(legacy_path, "rb") as f:
+                conversation_data = orjson.loads(f.read())
+            conversation_data["id"] = continuation_id
+            conversation_data.setdefault(
+                "updated_at", conversation_data.get("created_at")
+            )
+            messages = conversation_data.setdefault("messages", [])
+            self._write_metadata(conversation_data)
+            self._write_messages(self.get_conversation_file(continuation_id), messages)
+            os.remove(legacy_path)
+            self._index_put(conversation_data)
+        except Exception as e:
+            logger.error(
+                "STORAGE: Error migrating legacy conversation %s: %s",
+                continuation_id,
+                e,
+            )
+            return None
+
+        logger.info(
+            "STORAGE: Migrated legacy conversation %s (%d messages)",
+            continuation_id,
+            len(messages),
+        )
+        return conversation_data
+
     def save_conversation(self, conversation_data: Dict[str, Any]):
         """Save conversation data with cache update
 
@@ -145,17 +433,19 @@ class ConversationManager:
 
         try:
             # Update cache first (best practice for performance)
-            self._conversation_cache[continuation_id] = conversation_data
-
-            # Then persist to disk
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(conversation_data, f, indent=2)
-            logger.debug(f"Saved conversation {continuation_id}")
+            self._cache_put(continuation_id, conversation_data)
+            # Messages may have been replaced wholesale
+            self._history.pop(continuation_id, None)
+
+            # Then persist to disk, rewriting the whole message log
+            self._write_messages(file_path, conversation_data.get("messages", []))
+            self._write_metadata(conversation_data)
+            self._index_put(conversation_data)
+            logger.debug("Saved conversation %s", continuation_id)
         except Exception as e:
-            logger.error(f"Error saving conversation {continuation_id}: {e}")
+            logger.error("Error saving conversation %s: %s", continuation_id, e)
             # Remove from cache if save failed
-            if continuation_id in self._conversation_cache:
-                del self._conversation_cache[continuation_id]
+            self._conversation_cache.pop(continuation_id, None)
 
     def add_message(
         self,
@@ -175,14 +465,29 @@ class ConversationManager:
         Returns:
             True if successful, False otherwise
         """
+        with self._get_lock(continuation_id):
+            return self._append_message(continuation_id, role, content, metadata)
+
+    def _append_message(
+        self,
+        continuation_id: str,
+        role: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]],
+    ) -> bool:
+        """Append a message; the caller holds the conversation's lock"""
         logger.debug(
-            f"STORAGE: Adding {role} message to conversation {continuation_id}"
+            "STORAGE: Adding %s message to conversation %s", role, continuation_id
         )
 
-        conversation_data = self.load_conversation(continuation_id)
+        # Go straight to the cache on the hot path; load only on a miss
+        conversation_data = self._cache_get(continuation_id) or self.load_conversation(
+            continuation_id
+        )
         if not conversation_data:
             logger.error(
-                f"STORAGE: Cannot add message to non-existent conversation: {continuation_id}"
+                "STORAGE: Cannot add message to non-existent conversation: %s",
+                continuation_id,
             )
             return False
 
@@ -195,28 +500,58 @@ class ConversationManager:
         if metadata:
             message["metadata"] = metadata
 
+        # Append just this message rather than rewriting the conversation
+        try:
+            with open(self.get_conversation_file(continuation_id), "ab") as f:
+                f.write(orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE))
+            conversation_data["updated_at"] = message["timestamp"]
+            self._write_metadata(conversation_data)
+        except Exception as e:
+            logger.error(
+                "STORAGE: Error appending message to conversation %s: %s",
+                continuation_id,
+                e,
+            )
+            return False
+
+        # The append above raised on any write failure, so no re-read is needed
         conversation_data["messages"].append(message)
-        logger.debug(
-            f"STORAGE: Message added to conversation data. Total messages: {len(conversation_data['messages'])}"
+        self._index_put(conversation_data)
+        logger.info(
+            "STORAGE: Successfully added %s message to conversation %s. Total messages: %d",
+            role,
+            continuation_id,
+            len(conversation_data["messages"]),
         )
+        return True
 
-        # Save conversation
-        self.save_conversation(conversation_data)
+    def _history_projection(
+        self, continuation_id: str, messages: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, str]], List[int]]:
+        """OpenAI-format messages and running char totals for a conversation
 
-        # Verify the message was actually saved
-        verification_data = self.load_conversation(continuation_id)
-        if verification_data and len(verification_data["messages"]) == len(
-            conversation_data["messages"]
-        ):
-            logger.info(
-                f"STORAGE: Successfully added {role} message to conversation {continuation_id}. Total messages: {len(verification_data['messages'])}"
+        Both are kept per conversation and only extended with messages added
+        since the last call. char_totals[i] is the content length of the first
+        i messages, so it starts at 0 and has one more entry than messages.
+        """
+        entry = self._history.get(continuation_id)
+        if entry is None:
+            entry = self._history[continuation_id] = ([], [0])
+        openai_messages, char_totals = entry
+        new_messages = messages[len(openai_messages) :]
+        if new_messages:
+            openai_messages.extend(
+                [
+                    {"role": msg["role"], "content": msg["content"]}
+                    for msg in new_messages
+                ]
             )
-            return True
-        else:
-            logger.error(
-                f"STORAGE: Failed to verify message save for conversation {continuation_id}"
+            base = char_totals[-1]
+            char_totals.extend(
+                base + total
+                for total in accumulate(len(msg["content"]) for msg in new_messages)
             )
-            return False
+        return entry
 
     def get_conversation_history(
         self, continuation_id: str, max_tokens: Optional[int] = None
@@ -234,41 +569,32 @@ class ConversationManager:
         if not conversation_data:
             return []
 
-        messages = conversation_data.get("messages", [])
-
-        # Convert to OpenAI format
-        openai_messages = []
-        for msg in messages:
-            openai_messages.append({"role": msg["role"], "content": msg["content"]})
+        openai_messages, char_totals = self._history_projection(
+            continuation_id, conversation_data.get("messages", [])
+        )
 
         # Token optimization (following Zen MCP pattern)
-        if max_tokens and len(openai_messages) > 0:
-            # Rough token estimation (4 chars = 1 token)
-            total_chars = sum(len(msg["content"]) for msg in openai_messages)
-            estimated_tokens = total_chars // 4
-
-            if estimated_tokens > max_tokens:
-                # Keep most recent messages within token limit
-                target_chars = max_tokens * 4
-                optimized_messages = []
-                current_chars = 0
-
-                # Start from most recent and work backwards
-                for msg in reversed(openai_messages):
-                    msg_chars = len(msg["content"])
-                    if current_chars + msg_chars <= target_chars:
-                        optimized_messages.insert(0, msg)
-                        current_chars += msg_chars
-                    else:
-                        break
-
-                logger.debug(
-                    f"Optimized conversation {continuation_id}: {len(openai_messages)} -> {len(optimized_messages)} messages"
-                )
-                openai_messages = optimized_messages
+        # Rough token estimation (4 chars = 1 token)
+        total_chars = char_totals[-1]
+        if max_tokens and openai_messages and total_chars // 4 > max_tokens:
+            # Keep the longest run of most recent messages within the limit:
+            # the first start index whose suffix fits in target_chars
+            target_chars = max_tokens * 4
+            start = bisect_left(char_totals, total_chars - target_chars)
+            logger.debug(
+                "Optimized conversation %s: %d -> %d messages",
+                continuation_id,
+                len(openai_messages),
+                len(openai_messages) - start,
+            )
+            openai_messages = openai_messages[start:]
+        else:
+            openai_messages = openai_messages[:]
 
         logger.debug(
-            f"Retrieved {len(openai_messages)} messages for conversation {continuation_id}"
+            "Retrieved %d messages for conversation %s",
+            len(openai_messages),
+            continuation_id,
         )
         return openai_messages
 
@@ -300,22 +626,55 @@ class ConversationManager:
         Returns:
             List of conversation summaries
         """
+        try:
+            # Most recently updated first
+            rows = self._index.execute(
+                "SELECT id, created_at, updated_at, message_count,"
+                " last_message_preview FROM conversations ORDER BY updated_at DESC"
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Error listing conversations from index: %s", e)
+            return self._list_conversations_from_disk()
+
+        return [
+            {
+                "id": continuation_id,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "message_count": message_count,
+                "last_message_preview": last_message_preview,
+            }
+            for (
+                continuation_id,
+                created_at,
+                updated_at,
+                message_count,
+                last_message_preview,
+            ) in rows
+        ]
+
+    def _list_conversations_from_disk(self) -> List[Dict[str, Any]]:
+        """Fallback listing straight from the files, newest log first"""
         conversations = []
-
         try:
-            for filename in os.listdir(self.storage_dir):
-                if filename.startswith("conversation_") and filename.endswith(".json"):
-                    continuation_id = filename[
-                        13:-5
-                    ]  # Remove "conversation_" and ".json"
-                    summary = self.get_conversation_summary(continuation_id)
-                    if summary:
-                        conversations.append(summary)
+            logs = self._scan_conversations()
+            logs.sort(key=lambda item: item[1].stat().st_mtime, reverse=True)
+            for continuation_id, _ in logs:
+                conversation_data = self.load_conversation(continuation_id)
+                if not conversation_data:
+                    continue
+                messages = conversation_data.get("messages", [])
+                conversations.append(
+                    {
+                        "id": continuation_id,
+                        "created_at": conversation_data.get("created_at"),
+                        "updated_at": conversation_data.get("updated_at"),
+                        "message_count": len(messages),
+                        "last_message_preview": self._preview(messages),
+                    }
+                )
         except Exception as e:
-            logger.error(f"Error listing conversations: {e}")
-
-        # Sort by updated_at (most recent first)
-        conversations.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
+            logger.error("Error listing conversations: %s", e)
         return conversations
 
     def delete_conversation(self, continuation_id: str) -> bool:
@@ -328,19 +687,32 @@ class ConversationManager:
             True if successful, False otherwise
         """
         file_path = self.get_conversation_file(continuation_id)
+        legacy_path = self.get_legacy_file(continuation_id)
 
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Deleted conversation: {continuation_id}")
+            if os.path.exists(file_path) or os.path.exists(legacy_path):
+                for path in (
+                    file_path,
+                    self.get_metadata_file(continuation_id),
+                    legacy_path,
+                ):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._conversation_cache.pop(continuation_id, None)
+                self._history.pop(continuation_id, None)
+                self._locks.pop(continuation_id, None)
+                self._index.execute(
+                    "DELETE FROM conversations WHERE id = ?", (continuation_id,)
+                )
+                logger.info("Deleted conversation: %s", continuation_id)
                 return True
             else:
                 logger.warning(
-                    f"Conversation not found for deletion: {continuation_id}"
+                    "Conversation not found for deletion: %s", continuation_id
                 )
                 return False
         except Exception as e:
-            logger.error(f"Error deleting conversation {continuation_id}: {e}")
+            logger.error("Error deleting conversation %s: %s", continuation_id, e)
             return False
 
     def cleanup_old_conversations(self, max_age_days: int = 30):
@@ -349,21 +721,18 @@ class ConversationManager:
         Args:
             max_age_days: Maximum age in days to keep conversations
         """
-        from datetime import timedelta
-
-        cutoff_date = datetime.utcnow() - timedelta(days=max_age_days)
-        cutoff_iso = cutoff_date.isoformat()
+        # Every message is appended to the log, so its mtime is the last update
+        cutoff_ts = time.time() - max_age_days * 86400
 
         deleted_count = 0
-        conversations = self.list_conversations()
-
-        for conv in conversations:
-            updated_at = conv.get("updated_at", "")
-            if updated_at < cutoff_iso:
-                if self.delete_conversation(conv["id"]):
+        for continuation_id, entry in self._scan_conversations():
+            if entry.stat().st_mtime < cutoff_ts:
+                if self.delete_conversation(continuation_id):
                     deleted_count += 1
 
         logger.info(
-            f"Cleaned up {deleted_count} old conversations (older than {max_age_days} days)"
+            "Cleaned up %d old conversations (older than %s days)",
+            deleted_count,
+            max_age_days,
         )
         return deleted_count
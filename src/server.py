@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
 """
-OpenRouter MCP Server - Simple Synchronous Version
-This version uses simple synchronous stdin to avoid Docker permission issues.
+OpenRouter MCP Server - Simple Asyncio Version
+Reads JSON-RPC from stdin and writes responses to stdout through asyncio pipe
+streams, so no thread is needed per line read.
 Enhanced with graceful shutdown protection for abrupt client disconnects.
 """
-import json
+import asyncio
+import atexit
+import email.utils
+import functools
+import hashlib
 import sys
 import os
 import logging
+import logging.handlers
+import queue
 import signal
 import threading
 import time
-from typing import Dict, Set, Optional
-from dotenv import load_dotenv
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, Set, Optional, Tuple
+import httpx
+import orjson
 
 # Set up paths for both direct execution and module import
 try:
@@ -21,8 +31,20 @@ try:
         DEFAULT_MODEL,
         get_model_alias,
         OPENROUTER_API_KEY,
+        OPENROUTER_BASE_URL,
         DEFAULT_MAX_TOKENS,
+        DEFAULT_MAX_REASONING_TOKENS,
         DEFAULT_TEMPERATURE,
+        MAX_CONCURRENT_REQUESTS,
+        OPENROUTER_MAX_CONCURRENCY,
+        OPENROUTER_MAX_RETRIES,
+        MAX_MESSAGE_SIZE,
+        MAX_PROMPT_BYTES,
+        CONV_CACHE_MAX,
+        RESPONSE_CACHE_ENABLED,
+        RESPONSE_CACHE_MAX,
+        LOG_LEVEL,
+        HOST_HOME,
         should_force_internet_search,
     )
 except ImportError:
@@ -31,33 +53,90 @@ except ImportError:
         DEFAULT_MODEL,
         get_model_alias,
         OPENROUTER_API_KEY,
+        OPENROUTER_BASE_URL,
         DEFAULT_MAX_TOKENS,
+        DEFAULT_MAX_REASONING_TOKENS,
         DEFAULT_TEMPERATURE,
+        MAX_CONCURRENT_REQUESTS,
+        OPENROUTER_MAX_CONCURRENCY,
+        OPENROUTER_MAX_RETRIES,
+        MAX_MESSAGE_SIZE,
+        MAX_PROMPT_BYTES,
+        CONV_CACHE_MAX,
+        RESPONSE_CACHE_ENABLED,
+        RESPONSE_CACHE_MAX,
+        LOG_LEVEL,
+        HOST_HOME,
         should_force_internet_search,
     )
 
-# Simple logging setup
+# Simple logging setup; stderr and the log file are both written by a
+# background listener thread so request handlers only pay for a queue put.
+# QueueHandler hands over records already formatted, hence the listener's
+# handlers keep the default "%(message)s".
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.StreamHandler(sys.stderr),
+    logging.FileHandler("/tmp/openrouter_simple.log", mode="w", delay=True),
+    respect_handler_level=True,
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
-    level=logging.INFO,
+    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stderr),
-        logging.FileHandler("/tmp/openrouter_simple.log", mode="w"),
-    ],
+    handlers=[logging.handlers.QueueHandler(_log_queue)],
 )
 logger = logging.getLogger("openrouter-simple")
 
-# Load environment
-load_dotenv()
-conversation_manager = ConversationManager()
+conversation_manager = ConversationManager(cache_max=CONV_CACHE_MAX)
 
 # Global state for graceful shutdown protection
 shutdown_requested = False
-active_requests: Dict[str, Dict] = {}  # request_id -> request_info
-active_requests_lock = threading.Lock()
+# request_id -> request_info, copy-on-write: writers swap in a new dict, so
+# readers can use the current one as a snapshot. Requests register and
+# unregister only on the event loop thread, so the writers need no lock either;
+# other threads (signal handling, shutdown) only read the current reference
+active_requests: Dict[str, Dict] = {}
+# Set whenever no request is active, so shutdown can wait without polling
+requests_idle = threading.Event()
+requests_idle.set()
+
+# JSON-RPC output stream, attached to stdout by main()
+_stdout: Optional[asyncio.StreamWriter] = None
+_stdin_feeder: Optional[asyncio.Task] = None
+
+# Pooled OpenRouter client, created by main() so chat calls reuse keep-alive
+# connections instead of paying a TCP+TLS handshake each time; over HTTP/2
+# concurrent chats share one connection
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Caps completions in flight at OpenRouter (created in main()); retries of
+# rate-limited or failed calls back off while holding their slot
+_openrouter_slots: Optional[asyncio.Semaphore] = None
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# Conversation writes scheduled by request handlers and run in worker threads,
+# so storing a message never delays a response or stalls the event loop; the
+# last pending write per conversation, which each new write waits for
+_pending_writes: Dict[str, asyncio.Task] = {}
+# Caps pending writes (created in main())
+_write_slots: Optional[asyncio.Semaphore] = None
+WRITE_QUEUE_SIZE = 1024
+
+# Completed responses keyed by a hash of the request body, most recent last;
+# only used when OPENROUTER_RESPONSE_CACHE is enabled
+_response_cache: "OrderedDict[bytes, Tuple[str, str]]" = OrderedDict()
+
+# Seconds in-flight requests get to finish once shutdown starts
+SHUTDOWN_GRACE_PERIOD = 30
 
 logger.info("Simple OpenRouter MCP Server starting...")
-logger.info(f"API Key configured: {bool(OPENROUTER_API_KEY)}")
+logger.info("API Key configured: %s", bool(OPENROUTER_API_KEY))
 
 
 class GracefulShutdownProtection:
@@ -68,199 +147,372 @@ class GracefulShutdownProtection:
         request_id: str, request_type: str, continuation_id: Optional[str] = None
     ):
         """Register an active request for tracking"""
-        with active_requests_lock:
-            active_requests[request_id] = {
-                "type": request_type,
-                "start_time": time.time(),
-                "continuation_id": continuation_id,
-                "status": "active",
-            }
+        global active_requests
+        request_info = {
+            "type": request_type,
+            "start_time": time.time(),
+            "continuation_id": continuation_id,
+            "status": "active",
+        }
+        active_requests = {**active_requests, request_id: request_info}
+        requests_idle.clear()
         logger.info(
-            f"PROTECTION: Registered active request {request_id} ({request_type})"
+            "PROTECTION: Registered active request %s (%s)", request_id, request_type
         )
 
     @staticmethod
     def unregister_request(request_id: str):
         """Unregister a completed request"""
-        with active_requests_lock:
-            if request_id in active_requests:
-                duration = time.time() - active_requests[request_id]["start_time"]
-                logger.info(
-                    f"PROTECTION: Completed request {request_id} in {duration:.2f}s"
-                )
-                del active_requests[request_id]
+        global active_requests
+        request_info = active_requests.get(request_id)
+        if request_info is None:
+            return
+        remaining = dict(active_requests)
+        del remaining[request_id]
+        active_requests = remaining
+        if not remaining:
+            requests_idle.set()
+        duration = time.time() - request_info["start_time"]
+        logger.info("PROTECTION: Completed request %s in %.2fs", request_id, duration)
 
     @staticmethod
     def get_active_requests() -> Dict[str, Dict]:
-        """Get snapshot of active requests"""
-        with active_requests_lock:
-            return active_requests.copy()
+        """Get snapshot of active requests (shared; callers must not modify it)"""
+        return active_requests
+
+    @staticmethod
+    def request_shutdown(reason: str):
+        """Flag shutdown without blocking; main() drains active requests on exit"""
+        global shutdown_requested
+        shutdown_requested = True
+        logger.warning("PROTECTION: %s", reason)
 
     @staticmethod
     def handle_shutdown():
-        """Handle graceful shutdown with active request protection"""
+        """Handle graceful shutdown with active request protection
+
+        Blocks while waiting, so it must not run on the event loop thread while
+        requests are still in flight; main() drains its tasks before calling it.
+        """
         global shutdown_requested
         shutdown_requested = True
 
+        # One snapshot for the report; it is never mutated, so no copy is needed
         active = GracefulShutdownProtection.get_active_requests()
         if active:
             logger.warning(
-                f"PROTECTION: Shutdown requested with {len(active)} active requests"
+                "PROTECTION: Shutdown requested with %d active requests", len(active)
             )
+            now = time.time()
             for req_id, req_info in active.items():
-                duration = time.time() - req_info["start_time"]
+                duration = now - req_info["start_time"]
                 logger.warning(
-                    f"PROTECTION: Active request {req_id} ({req_info['type']}) running for {duration:.2f}s"
+                    "PROTECTION: Active request %s (%s) running for %.2fs",
+                    req_id,
+                    req_info["type"],
+                    duration,
                 )
 
-            # Give active requests time to complete
-            max_wait = 30  # seconds
-            wait_interval = 1
-            waited = 0
-
-            while waited < max_wait:
-                active = GracefulShutdownProtection.get_active_requests()
-                if not active:
-                    logger.info(
-                        "PROTECTION: All requests completed, proceeding with shutdown"
-                    )
-                    break
-
+            # Give active requests time to complete; wakes as soon as the last
+            # one unregisters
+            logger.info(
+                "PROTECTION: Waiting up to %ss for %d active requests to complete...",
+                SHUTDOWN_GRACE_PERIOD,
+                len(active),
+            )
+            if requests_idle.wait(timeout=SHUTDOWN_GRACE_PERIOD):
                 logger.info(
-                    f"PROTECTION: Waiting for {len(active)} active requests to complete... ({waited}s/{max_wait}s)"
+                    "PROTECTION: All requests completed, proceeding with shutdown"
                 )
-                time.sleep(wait_interval)
-                waited += wait_interval
+                return
 
-            # Force cleanup remaining requests
+            # Force cleanup remaining requests; re-read once, since requests
+            # may have finished during the wait
             active = GracefulShutdownProtection.get_active_requests()
             if active:
                 logger.warning(
-                    f"PROTECTION: Force shutdown with {len(active)} requests still active"
+                    "PROTECTION: Force shutdown with %d requests still active",
+                    len(active),
                 )
-                for req_id, req_info in active.items():
+                for req_info in active.values():
                     if req_info.get("continuation_id"):
                         logger.info(
-                            f"PROTECTION: Preserving conversation state for {req_info['continuation_id']}"
+                            "PROTECTION: Preserving conversation state for %s",
+                            req_info["continuation_id"],
                         )
         else:
             logger.info("PROTECTION: Clean shutdown - no active requests")
 
 
-def signal_handler(signum, frame):
-    """Handle shutdown signals gracefully"""
-    logger.info(
-        f"PROTECTION: Received signal {signum}, initiating graceful shutdown..."
-    )
-    GracefulShutdownProtection.handle_shutdown()
-    sys.exit(0)
+def _error_response(req_id, code: int, message: str) -> dict:
+    """Build a JSON-RPC error response."""
+    return {
+        "jsonrpc": "2.0",
+        "id": req_id,
+        "error": {"code": code, "message": message},
+    }
 
 
-# Register signal handlers
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
-
-
-def send_response(response_data):
+async def send_response(response_data):
     """Send JSON-RPC response to stdout with disconnect protection."""
     try:
-        # Check if shutdown is requested
-        if shutdown_requested:
-            logger.debug("PROTECTION: Skipping response send due to shutdown")
+        # Requests still finishing during the shutdown grace period keep
+        # answering; only skip once the client side of stdout is gone
+        if _stdout is None or _stdout.is_closing():
+            logger.debug("PROTECTION: Skipping response send, stdout closed")
+            GracefulShutdownProtection.request_shutdown(
+                "stdout closed while sending response, client disconnected"
+            )
             return
 
-        response_str = json.dumps(response_data)
-        logger.info(f"Sending response: {response_str}")
-        print(response_str, flush=True)
-        sys.stdout.flush()
-    except BrokenPipeError:
-        logger.warning(
-            "PROTECTION: Broken pipe while sending response, client disconnected"
+        # The frame delimiter comes out of the same dumps() call, so each
+        # response is one buffer and one write
+        response_bytes = orjson.dumps(response_data, option=orjson.OPT_APPEND_NEWLINE)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Sending response: %.200s", response_bytes.decode("utf-8").rstrip()
+            )
+        # Concurrent requests share stdout; write() queues the whole frame in
+        # one call, so frames cannot interleave and no lock is needed
+        _stdout.write(response_bytes)
+        await _stdout.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        GracefulShutdownProtection.request_shutdown(
+            "Broken pipe while sending response, client disconnected"
         )
-        GracefulShutdownProtection.handle_shutdown()
     except OSError as e:
         if e.errno == 32:  # Broken pipe
-            logger.warning(
-                "PROTECTION: Broken pipe (OSError 32) while sending response"
+            GracefulShutdownProtection.request_shutdown(
+                "Broken pipe (OSError 32) while sending response"
             )
-            GracefulShutdownProtection.handle_shutdown()
         else:
-            logger.error(f"OSError sending response: {e}")
+            logger.error("OSError sending response: %s", e)
+    except Exception as e:
+        logger.error("Failed to send response: %s", e)
+
+
+def _read_file_prefix(path: str, length: int) -> str:
+    """Read and decode the first length bytes of a file"""
+    # Unbuffered reads, skipping the file object layers; decode once from
+    # bytes so a stray non-UTF-8 byte doesn't lose the file
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    try:
+        data = os.read(fd, length)
+        # Usually one read; FUSE, 9p and Docker Desktop bind mounts (the
+        # /host home mount) may return less than asked before EOF
+        if len(data) < length:
+            parts = [data]
+            remaining = length - len(data)
+            while remaining:
+                chunk = os.read(fd, remaining)
+                if not chunk:
+                    break
+                parts.append(chunk)
+                remaining -= len(chunk)
+            data = b"".join(parts)
+    finally:
+        os.close(fd)
+    return data.decode("utf-8", errors="replace")
+
+
+# The same files tend to be re-attached on every conversation turn, so whole
+# files are kept decoded, keyed by (path, mtime_ns, size); a changed file gets
+# a new key and the stale entry ages out of the LRU
+@functools.lru_cache(maxsize=128)
+def _read_file_cached(path: str, mtime_ns: int, size: int) -> str:
+    """Read and decode a whole file of the given size"""
+    return _read_file_prefix(path, size)
+
+
+def _read_attached_file(path: str, limit: int) -> Tuple[str, bool]:
+    """Read at most limit bytes of an attached file; returns (content, truncated)
+
+    Only complete reads are cached: the limit is whatever prompt budget is
+    left, so a truncated read would rarely be asked for with the same length.
+    """
+    st = os.stat(path)
+    if st.st_size > limit:
+        return _read_file_prefix(path, limit), True
+    return _read_file_cached(path, st.st_mtime_ns, st.st_size), False
+
+
+async def _store_message(continuation_id: str, role: str, content: str):
+    """Schedule a conversation message write; it runs in a worker thread"""
+    # Waits only when too many writes are pending, which throttles chat handlers
+    await _write_slots.acquire()
+    previous = _pending_writes.get(continuation_id)
+    task = asyncio.create_task(_write_message(previous, continuation_id, role, content))
+    _pending_writes[continuation_id] = task
+    task.add_done_callback(lambda t: _write_done(continuation_id, t))
+
+
+async def _write_message(
+    previous: Optional[asyncio.Task], continuation_id: str, role: str, content: str
+):
+    """Persist one message after the conversation's previous write"""
+    try:
+        if previous is not None:
+            # Keeps each conversation's messages in order; its outcome is
+            # logged by its own task
+            await asyncio.wait((previous,))
+        # The manager serializes appends with a per-conversation lock; doing
+        # the disk and index writes off the loop keeps streams flowing
+        if not await asyncio.to_thread(
+            conversation_manager.add_message, continuation_id, role, content
+        ):
+            logger.error("Failed to store %s message for %s", role, continuation_id)
     except Exception as e:
-        logger.error(f"Failed to send response: {e}")
+        logger.error("Error storing message for %s: %s", continuation_id, e)
+    finally:
+        _write_slots.release()
+
+
+def _write_done(continuation_id: str, task: asyncio.Task):
+    """Forget a conversation's last write once it has finished"""
+    if _pending_writes.get(continuation_id) is task:
+        del _pending_writes[continuation_id]
+
+
+async def _flush_storage_writes(continuation_id: Optional[str] = None):
+    """Wait for a conversation's pending writes (all of them when None)
 
+    Called before reading stored history, so reads see every stored message.
+    """
+    if continuation_id is not None:
+        task = _pending_writes.get(continuation_id)
+        if task is not None:
+            await asyncio.wait((task,))
+    elif _pending_writes:
+        await asyncio.wait(tuple(_pending_writes.values()))
 
-def process_files_and_images(prompt: str, files: list, images: list) -> str:
+
+# The host home directory is mounted at /host<HOST_HOME> in the container
+_CONTAINER_HOME = f"/host{HOST_HOME}" if HOST_HOME else None
+
+
+def _to_container_path(file_path: str) -> str:
+    """Map a host path under HOST_HOME to where the container sees it"""
+    # Only attempt translation if the file is under the home directory and we have HOST_HOME
+    if _CONTAINER_HOME and file_path.startswith(HOST_HOME):
+        return _CONTAINER_HOME + file_path[len(HOST_HOME) :]
+    if not HOST_HOME and file_path.startswith("/home/"):
+        logger.warning(
+            "HOST_HOME not set but file is under /home/. Path translation may fail."
+        )
+    return file_path
+
+
+async def process_files_and_images(prompt: str, files: list, images: list) -> str:
     """Process files and images to enhance the prompt with context."""
-    enhanced_prompt = prompt
-    host_home = os.environ.get("HOST_HOME")
+    # Collected as fragments and joined once, since file contents can be large
+    parts = [prompt]
 
     if files:
-        logger.info(f"Processing {len(files)} files")
-        enhanced_prompt += "\n\n**Attached Files:**\n"
+        parts.append("\n\n**Attached Files:**\n")
+        container_paths = []
         for file_path in files:
-            try:
-                container_path = file_path
-                # Only attempt translation if the file is under the home directory and we have HOST_HOME
-                if host_home and file_path.startswith(host_home):
-                    container_path = file_path.replace(
-                        host_home, f"/host{host_home}", 1
-                    )
-                elif file_path.startswith("/home/") and not host_home:
-                    logger.warning(
-                        "HOST_HOME not set but file is under /home/. Path translation may fail."
-                    )
-
-                logger.info(f"Reading file: {file_path} -> {container_path}")
-                with open(container_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    enhanced_prompt += (
-                        f"\n**{os.path.basename(file_path)}:**\n```\n{content}\n```\n"
-                    )
-            except Exception as e:
+            container_path = _to_container_path(file_path)
+            logger.debug("Reading file: %s -> %s", file_path, container_path)
+            container_paths.append(container_path)
+
+        # Files share what the prompt leaves of MAX_PROMPT_BYTES, in order; no
+        # single read needs more than all of it
+        budget = max(MAX_PROMPT_BYTES - len(prompt), 0)
+
+        # Read off the event loop, all files at once
+        results = await asyncio.gather(
+            *(
+                asyncio.to_thread(_read_attached_file, p, budget)
+                for p in container_paths
+            ),
+            return_exceptions=True,
+        )
+        total_chars = 0
+        cut = 0
+        for file_path, container_path, result in zip(files, container_paths, results):
+            name = os.path.basename(file_path)
+            if isinstance(result, Exception):
                 logger.error(
-                    f"Error reading file {file_path} (tried {container_path}): {e}"
+                    "Error reading file %s (tried %s): %s",
+                    file_path,
+                    container_path,
+                    result,
                 )
-                enhanced_prompt += (
-                    f"\n**{os.path.basename(file_path)}:** Error reading file: {e}\n"
+                parts.append(f"\n**{name}:** Error reading file: {result}\n")
+                continue
+
+            content, truncated = result
+            remaining = budget - total_chars
+            if remaining <= 0:
+                cut += 1
+                parts.append(f"\n**{name}:** Omitted: prompt size limit reached\n")
+                continue
+            if truncated or len(content) > remaining:
+                cut += 1
+                content = content[:remaining]
+                truncated = True
+            total_chars += len(content)
+            # Content goes in as its own fragment so it is copied only by
+            # the final join, not into an intermediate f-string first
+            parts.extend(
+                (
+                    f"\n**{name}:**\n```\n",
+                    content,
+                    "\n...[truncated]\n```\n" if truncated else "\n```\n",
                 )
+            )
+        logger.info("Attached %d files, total chars %d", len(files), total_chars)
+        if cut:
+            logger.warning(
+                "Truncated or omitted %d attached files to stay within "
+                "OPENROUTER_MAX_PROMPT_BYTES (%d)",
+                cut,
+                MAX_PROMPT_BYTES,
+            )
 
     if images:
-        logger.info(f"Processing {len(images)} images")
-        enhanced_prompt += "\n\n**Attached Images:**\n"
-        for image_path in images:
-            enhanced_prompt += f"- {os.path.basename(image_path)}\n"
+        logger.info("Processing %d images", len(images))
+        parts.append("\n\n**Attached Images:**\n")
+        parts.extend(f"- {os.path.basename(image_path)}\n" for image_path in images)
+
+    return "".join(parts)
+
+
+# Model name keywords for models that reason (and get the longer timeout), and
+# the share of DEFAULT_MAX_REASONING_TOKENS each thinking effort may use
+_REASONING_MODEL_KEYWORDS = (
+    "thinking",
+    "claude",
+    "gemini",
+    "glm",
+    "deepseek",
+    "grok",
+    "qwen",
+)
+_REASONING_EFFORT_RATIOS = MappingProxyType({"high": 0.8, "medium": 0.5, "low": 0.2})
 
-    return enhanced_prompt
+
+def _is_reasoning_model(model: str) -> bool:
+    """Whether a model name matches one of the reasoning model keywords"""
+    model_lower = model.lower()
+    return any(keyword in model_lower for keyword in _REASONING_MODEL_KEYWORDS)
 
 
 def add_reasoning_config(data: dict, model: str, thinking_effort: str) -> dict:
     """Add reasoning configuration to request data based on model capabilities."""
-    reasoning_models = [
-        "thinking",
-        "claude",
-        "gemini",
-        "glm",
-        "deepseek",
-        "grok",
-        "qwen",
-    ]
     clean_model = model.replace(":online", "")
-    has_reasoning = any(keyword in clean_model.lower() for keyword in reasoning_models)
-
-    if has_reasoning and thinking_effort in ["high", "medium", "low"]:
-        from .config import DEFAULT_MAX_REASONING_TOKENS
 
-        effort_ratios = {"high": 0.8, "medium": 0.5, "low": 0.2}
+    if _is_reasoning_model(clean_model) and thinking_effort in _REASONING_EFFORT_RATIOS:
+        model_lower = clean_model.lower()
         reasoning_budget = int(
-            DEFAULT_MAX_REASONING_TOKENS * effort_ratios[thinking_effort]
+            DEFAULT_MAX_REASONING_TOKENS * _REASONING_EFFORT_RATIOS[thinking_effort]
         )
         reasoning_budget = min(
             reasoning_budget,
-            32000 if "claude" in clean_model.lower() else DEFAULT_MAX_REASONING_TOKENS,
+            32000 if "claude" in model_lower else DEFAULT_MAX_REASONING_TOKENS,
         )
 
-        if "anthropic" in clean_model.lower() or "claude" in clean_model.lower():
+        if "anthropic" in model_lower or "claude" in model_lower:
             data["thinking"] = {"budget_tokens": reasoning_budget}
         else:
             data["reasoning"] = {
@@ -270,49 +522,189 @@ def add_reasoning_config(data: dict, model: str, thinking_effort: str) -> dict:
             }
 
         logger.info(
-            f"Enabled reasoning for model {clean_model} with effort: {thinking_effort}, reasoning_budget: {reasoning_budget}"
+            "Enabled reasoning for model %s with effort: %s, reasoning_budget: %d",
+            clean_model,
+            thinking_effort,
+            reasoning_budget,
         )
 
     return data
 
 
-def _execute_chat_completion(
-    req_id: str, arguments: dict, is_custom_model: bool = False
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying, from Retry-After or exponential backoff"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), RETRY_MAX_DELAY)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after)
+                return min(max(when.timestamp() - time.time(), 0.0), RETRY_MAX_DELAY)
+            except (TypeError, ValueError):
+                pass
+    return min(RETRY_BASE_DELAY * 2**attempt, RETRY_MAX_DELAY)
+
+
+async def _stream_completion(
+    req_id: str,
+    data: dict,
+    timeout: float,
+    progress_token=None,
+) -> Tuple[str, str]:
+    """Run a streamed chat completion and return its (content, reasoning).
+
+    At most OPENROUTER_MAX_CONCURRENCY completions run at once. Responses
+    with a 429 or 5xx status are retried up to OPENROUTER_MAX_RETRIES times,
+    honouring Retry-After; nothing has been streamed at that point.
+    """
+    # Encoded once with orjson; the body carries the history and attached files
+    body = orjson.dumps(data)
+    async with _openrouter_slots:
+        attempt = 0
+        while True:
+            async with _http_client.stream(
+                "POST",
+                f"{OPENROUTER_BASE_URL}/chat/completions",
+                content=body,
+                headers={"Content-Type": "application/json"},
+                timeout=timeout,
+            ) as response:
+                if not response.is_error:
+                    content_type = response.headers.get("content-type", "")
+                    if content_type.startswith("text/event-stream"):
+                        return await _read_completion_stream(
+                            response, req_id, progress_token
+                        )
+                    return await _read_completion_body(response, req_id)
+
+                # Load the body so the error handler can report OpenRouter's message
+                await response.aread()
+                if (
+                    response.status_code not in _RETRY_STATUSES
+                    or attempt >= OPENROUTER_MAX_RETRIES
+                ):
+                    response.raise_for_status()
+                delay = _retry_delay(response, attempt)
+
+            attempt += 1
+            logger.warning(
+                "OpenRouter returned %d for %s, retry %d/%d in %.1fs",
+                response.status_code,
+                req_id,
+                attempt,
+                OPENROUTER_MAX_RETRIES,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+
+async def _read_completion_stream(
+    response: httpx.Response, req_id: str, progress_token=None
+) -> Tuple[str, str]:
+    """Collect a completion's SSE deltas into (content, reasoning).
+
+    When the client passed a progress token, each content delta is forwarded
+    as a notifications/progress message as soon as it arrives.
+    """
+    content_parts = []
+    reasoning_parts = []
+    chunks = 0
+
+    async for line in response.aiter_lines():
+        # Blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+        if not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            break
+
+        chunk = orjson.loads(payload)
+        if "error" in chunk:
+            raise RuntimeError(chunk["error"].get("message", chunk["error"]))
+        if not chunk.get("choices"):
+            continue
+
+        delta = chunk["choices"][0].get("delta") or {}
+        if delta.get("reasoning"):
+            reasoning_parts.append(delta["reasoning"])
+        text = delta.get("content")
+        if not text:
+            continue
+        content_parts.append(text)
+        chunks += 1
+
+        if progress_token is not None:
+            await send_response(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "notifications/progress",
+                    "params": {
+                        "progressToken": progress_token,
+                        "progress": chunks,
+                        "message": text,
+                    },
+                }
+            )
+
+    ai_response = "".join(content_parts)
+    logger.debug(
+        "Streamed response for %s: %d chunks, %d characters",
+        req_id,
+        chunks,
+        len(ai_response),
+    )
+    return ai_response, "".join(reasoning_parts)
+
+
+async def _read_completion_body(
+    response: httpx.Response, req_id: str
+) -> Tuple[str, str]:
+    """Read a non-streamed completion into (content, reasoning).
+
+    Used when the upstream ignores "stream": true and answers with a plain
+    JSON body instead of SSE.
+    """
+    result = orjson.loads(await response.aread())
+    if "error" in result:
+        raise RuntimeError(result["error"].get("message", result["error"]))
+    message = result["choices"][0]["message"]
+    ai_response = message.get("content") or ""
+    logger.debug(
+        "Non-streamed response for %s: %d characters", req_id, len(ai_response)
+    )
+    return ai_response, message.get("reasoning") or ""
+
+
+async def _execute_chat_completion(
+    req_id: str, arguments: dict, is_custom_model: bool = False, progress_token=None
 ):
     """Unified handler for all chat completions."""
     continuation_id = arguments.get("continuation_id")
     GracefulShutdownProtection.register_request(req_id, "chat", continuation_id)
 
     try:
+        # Reject and validate before anything with side effects, such as
+        # creating a conversation
+        if shutdown_requested:
+            logger.warning(
+                "PROTECTION: Rejecting new request %s due to shutdown", req_id
+            )
+            return _error_response(
+                req_id, -32000, "Server shutting down, request rejected"
+            )
+
         prompt = arguments.get("prompt")
         if not prompt:
-            send_response(
-                {
-                    "jsonrpc": "2.0",
-                    "id": req_id,
-                    "error": {
-                        "code": -32602,
-                        "message": "Missing required parameter: prompt",
-                    },
-                }
-            )
-            return
+            return _error_response(req_id, -32602, "Missing required parameter: prompt")
 
         # Resolve model
         if is_custom_model:
             model_name = arguments.get("custom_model")
             if not model_name:
-                send_response(
-                    {
-                        "jsonrpc": "2.0",
-                        "id": req_id,
-                        "error": {
-                            "code": -32602,
-                            "message": "Missing required parameter: custom_model",
-                        },
-                    }
+                return _error_response(
+                    req_id, -32602, "Missing required parameter: custom_model"
                 )
-                return
             actual_model = model_name
         else:
             model_alias = arguments.get("model", DEFAULT_MODEL)
@@ -322,25 +714,8 @@ def _execute_chat_completion(
         if not continuation_id:
             continuation_id = conversation_manager.create_conversation()
 
-        # Check for shutdown request before proceeding
-        if shutdown_requested:
-            logger.warning(
-                f"PROTECTION: Rejecting new request {req_id} due to shutdown"
-            )
-            send_response(
-                {
-                    "jsonrpc": "2.0",
-                    "id": req_id,
-                    "error": {
-                        "code": -32000,
-                        "message": "Server shutting down, request rejected",
-                    },
-                }
-            )
-            return
-
         # Process files and images to add to prompt
-        enhanced_prompt = process_files_and_images(
+        enhanced_prompt = await process_files_and_images(
             prompt, arguments.get("files", []), arguments.get("images", [])
         )
 
@@ -353,26 +728,20 @@ def _execute_chat_completion(
             and should_force_internet_search(actual_model)
         ):
             final_model = f"{actual_model}:online"
-            logger.info(f"Enabling web search: {actual_model} -> {final_model}")
+            logger.info("Enabling web search: %s -> %s", actual_model, final_model)
 
-        # Add user message with enhanced content
-        conversation_manager.add_message(continuation_id, "user", enhanced_prompt)
+        # Read the history once and extend it locally rather than reloading it
+        # after the user message has been stored
+        await _flush_storage_writes(continuation_id)
         messages = conversation_manager.get_conversation_history(continuation_id)
+        messages.append({"role": "user", "content": enhanced_prompt})
+        await _store_message(continuation_id, "user", enhanced_prompt)
 
         # Debug logging
-        logger.info(f"Enhanced prompt length: {len(enhanced_prompt)}")
-        logger.info(f"Number of messages being sent: {len(messages)}")
-
-        import httpx
+        logger.debug("Enhanced prompt length: %d", len(enhanced_prompt))
+        logger.debug("Number of messages being sent: %d", len(messages))
 
-        logger.info(f"Calling OpenRouter with model: {final_model}")
-
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://claude.ai",
-            "X-Title": "OpenRouter MCP Server",
-        }
+        logger.info("Calling OpenRouter with model: %s", final_model)
 
         data = {
             "model": final_model,
@@ -390,319 +759,274 @@ def _execute_chat_completion(
         data = add_reasoning_config(data, final_model, thinking_effort)
 
         # Set timeout based on model capabilities
-        timeout = (
-            180.0
-            if any(
-                keyword in final_model.lower()
-                for keyword in [
-                    "thinking",
-                    "claude",
-                    "gemini",
-                    "glm",
-                    "deepseek",
-                    "grok",
-                    "qwen",
-                ]
-            )
-            else 60.0
-        )
+        timeout = 180.0 if _is_reasoning_model(final_model) else 60.0
 
-        with httpx.Client(timeout=timeout) as client:
-            response = client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data,
-            )
-            response.raise_for_status()
+        data["stream"] = True
 
-            # Parse JSON response with error handling
-            try:
-                response_text = response.text
-                logger.info(f"Response size: {len(response_text)} characters")
+        cache_key = None
+        cached = None
+        if RESPONSE_CACHE_ENABLED:
+            cache_key = hashlib.blake2b(orjson.dumps(data), digest_size=16).digest()
+            cached = _response_cache.get(cache_key)
 
-                if len(response_text) > 1048576:  # 1MB
-                    logger.warning(
-                        f"Very large response ({len(response_text)} chars), may cause parsing issues"
-                    )
-
-                result = response.json()
-
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error: {e}")
-                send_response(
-                    {
-                        "jsonrpc": "2.0",
-                        "id": req_id,
-                        "error": {
-                            "code": -32603,
-                            "message": f"Failed to parse OpenRouter response: {e}",
-                        },
-                    }
+        try:
+            if cached is not None:
+                _response_cache.move_to_end(cache_key)
+                ai_response, reasoning = cached
+                logger.info("Serving cached response for %s", final_model)
+            else:
+                ai_response, reasoning = await _stream_completion(
+                    req_id, data, timeout, progress_token
                 )
-                return
-
-        # Extract response, handling both regular content and reasoning tokens
-        message = result["choices"][0]["message"]
-        ai_response = message.get("content", "")
+                if cache_key is not None:
+                    _response_cache[cache_key] = (ai_response, reasoning)
+                    if len(_response_cache) > RESPONSE_CACHE_MAX:
+                        _response_cache.popitem(last=False)
+        except orjson.JSONDecodeError as e:
+            logger.error("JSON decode error: %s", e)
+            return _error_response(
+                req_id, -32603, f"Failed to parse OpenRouter response: {e}"
+            )
 
         # Check if model returned reasoning tokens
-        reasoning = message.get("reasoning", "")
         if reasoning:
             ai_response = (
                 f"{reasoning}\n\n---\n\n{ai_response}" if ai_response else reasoning
             )
-            logger.info(f"Model returned reasoning tokens: {len(reasoning)} chars")
+            logger.info("Model returned reasoning tokens: %d chars", len(reasoning))
 
         # Add AI response to conversation
-        conversation_manager.add_message(continuation_id, "assistant", ai_response)
-
-        # Send result
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "result": {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"**{actual_model}**: {ai_response}\n\n*Conversation ID: {continuation_id}*",
-                        }
-                    ],
-                    "continuation_id": continuation_id,
-                },
-            }
-        )
+        await _store_message(continuation_id, "assistant", ai_response)
+
+        return {
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "result": {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": f"**{actual_model}**: {ai_response}\n\n*Conversation ID: {continuation_id}*",
+                    }
+                ],
+                "continuation_id": continuation_id,
+            },
+        }
 
     except httpx.HTTPStatusError as e:
-        logger.error(f"HTTP error in chat request: {e}")
+        logger.error("HTTP error in chat request: %s", e)
         error_detail = e.response.text
         try:
             error_json = e.response.json()
             error_detail = error_json.get("error", {}).get("message", error_detail)
         except:
             pass
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"OpenRouter API error: {str(e)} - Details: {error_detail}",
-                },
-            }
+        return _error_response(
+            req_id, -32603, f"OpenRouter API error: {str(e)} - Details: {error_detail}"
         )
     except Exception as e:
-        logger.error(f"Error calling OpenRouter: {e}")
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "error": {"code": -32603, "message": f"OpenRouter API error: {str(e)}"},
-            }
-        )
+        logger.error("Error calling OpenRouter: %s", e)
+        return _error_response(req_id, -32603, f"OpenRouter API error: {str(e)}")
     finally:
         # Always unregister the request when done
         GracefulShutdownProtection.unregister_request(req_id)
 
 
-def handle_initialize(req_id):
-    """Handle initialize request."""
-    logger.info("Handling initialize request")
-    send_response(
-        {
-            "jsonrpc": "2.0",
-            "id": req_id,
-            "result": {
-                "protocolVersion": "2024-10-07",
-                "capabilities": {"tools": {}},
-                "serverInfo": {"name": "openrouter-simple", "version": "1.0.0"},
-            },
-        }
-    )
-
-
-def handle_tools_list(req_id):
-    """Handle tools/list request."""
-    logger.info("Handling tools/list request")
-    tools = [
-        {
-            "name": "chat",
-            "description": "**PRIMARY TOOL** - Chat with OpenRouter AI models using intelligent model aliases. This is the DEFAULT tool for all standard model requests. Uses smart model resolution with aliases like 'gemini', 'deepseek', 'kimi', 'grok', 'qwen-max', 'qwen-coder', 'glm' that automatically map to the best available models. For best results: include relevant files using the 'files' parameter to provide context, maintain conversation history with continuation_id, and include images when working with visual content.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "prompt": {
-                        "type": "string",
-                        "description": "User message with necessary context and background information",
-                    },
-                    "model": {
-                        "type": "string",
-                        "description": "Model alias to use. PREFERRED ALIASES: 'gemini' (Google Gemini 2.5 Pro), 'deepseek' (DeepSeek R1), 'deepseek-v3.1' (DeepSeek Chat v3.1), 'kimi' (moonshotai/kimi-k2-thinking), 'grok' (Grok Code Fast 1), 'qwen-max' (Qwen3 Max), 'qwen-coder' (Qwen3 Coder Plus), 'glm' (GLM 4.5), 'gpt-5' (OpenAI GPT-5). These aliases automatically resolve to the correct OpenRouter model codes.",
-                        "default": DEFAULT_MODEL,
-                    },
-                    "continuation_id": {
-                        "type": "string",
-                        "description": "UUID of an existing conversation to continue. Copy the exact UUID from previous responses to maintain conversation memory and context.",
-                    },
-                    "files": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Absolute paths to files providing context. Essential for accurate responses, especially for code-related queries. Include all relevant source files, config files, documentation, etc.",
-                    },
-                    "images": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Absolute paths to images for visual analysis. Required when working with screenshots, diagrams, charts, or any visual content. Supports .png, .jpg, .jpeg, .gif, .svg, .webp formats.",
-                    },
-                    "force_internet_search": {
-                        "type": "boolean",
-                        "description": "Enable web search for models that support it (like Gemini) to get current information.",
-                        "default": True,
-                    },
-                    "thinking_effort": {
-                        "type": "string",
-                        "enum": ["high", "medium", "low"],
-                        "description": "Controls reasoning depth for capable models. Use 'high' for complex problems, 'medium' for standard queries, 'low' for simple tasks.",
-                        "default": "high",
-                    },
+# Tool schemas are fixed for the life of the process, so tools/list serves
+# this prebuilt result instead of rebuilding it per request
+_TOOLS = [
+    {
+        "name": "chat",
+        "description": "**PRIMARY TOOL** - Chat with OpenRouter AI models using intelligent model aliases. This is the DEFAULT tool for all standard model requests. Uses smart model resolution with aliases like 'gemini', 'deepseek', 'kimi', 'grok', 'qwen-max', 'qwen-coder', 'glm' that automatically map to the best available models. For best results: include relevant files using the 'files' parameter to provide context, maintain conversation history with continuation_id, and include images when working with visual content.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "prompt": {
+                    "type": "string",
+                    "description": "User message with necessary context and background information",
+                },
+                "model": {
+                    "type": "string",
+                    "description": "Model alias to use. PREFERRED ALIASES: 'gemini' (Google Gemini 2.5 Pro), 'deepseek' (DeepSeek R1), 'deepseek-v3.1' (DeepSeek Chat v3.1), 'kimi' (moonshotai/kimi-k2-thinking), 'grok' (Grok Code Fast 1), 'qwen-max' (Qwen3 Max), 'qwen-coder' (Qwen3 Coder Plus), 'glm' (GLM 4.5), 'gpt-5' (OpenAI GPT-5). These aliases automatically resolve to the correct OpenRouter model codes.",
+                    "default": DEFAULT_MODEL,
+                },
+                "continuation_id": {
+                    "type": "string",
+                    "description": "UUID of an existing conversation to continue. Copy the exact UUID from previous responses to maintain conversation memory and context.",
+                },
+                "files": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Absolute paths to files providing context. Essential for accurate responses, especially for code-related queries. Include all relevant source files, config files, documentation, etc.",
+                },
+                "images": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Absolute paths to images for visual analysis. Required when working with screenshots, diagrams, charts, or any visual content. Supports .png, .jpg, .jpeg, .gif, .svg, .webp formats.",
+                },
+                "force_internet_search": {
+                    "type": "boolean",
+                    "description": "Enable web search for models that support it (like Gemini) to get current information.",
+                    "default": True,
+                },
+                "thinking_effort": {
+                    "type": "string",
+                    "enum": ["high", "medium", "low"],
+                    "description": "Controls reasoning depth for capable models. Use 'high' for complex problems, 'medium' for standard queries, 'low' for simple tasks.",
+                    "default": "high",
                 },
-                "required": ["prompt"],
             },
+            "required": ["prompt"],
         },
-        {
-            "name": "list_conversations",
-            "description": "List all saved conversations",
-            "inputSchema": {"type": "object", "properties": {}, "required": []},
-        },
-        {
-            "name": "get_conversation",
-            "description": "Get conversation history by ID",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "continuation_id": {
-                        "type": "string",
-                        "description": "Conversation ID to retrieve",
-                    }
-                },
-                "required": ["continuation_id"],
+    },
+    {
+        "name": "list_conversations",
+        "description": "List all saved conversations",
+        "inputSchema": {"type": "object", "properties": {}, "required": []},
+    },
+    {
+        "name": "get_conversation",
+        "description": "Get conversation history by ID",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "continuation_id": {
+                    "type": "string",
+                    "description": "Conversation ID to retrieve",
+                }
             },
+            "required": ["continuation_id"],
         },
-        {
-            "name": "delete_conversation",
-            "description": "Delete a conversation by ID",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "continuation_id": {
-                        "type": "string",
-                        "description": "Conversation ID to delete",
-                    }
-                },
-                "required": ["continuation_id"],
+    },
+    {
+        "name": "delete_conversation",
+        "description": "Delete a conversation by ID",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "continuation_id": {
+                    "type": "string",
+                    "description": "Conversation ID to delete",
+                }
             },
+            "required": ["continuation_id"],
         },
-        {
-            "name": "chat_with_custom_model",
-            "description": "**ADVANCED TOOL - USE ONLY WHEN NEEDED** - Chat with OpenRouter models using exact model codes. WARNING: Only use this tool when you need a specific model code that is NOT available in the standard aliases (gemini, deepseek, kimi, grok, qwen-max, qwen-coder, glm, gpt-5). For 99% of requests, use the 'chat' tool instead. This tool bypasses intelligent model resolution and requires exact OpenRouter model codes like 'anthropic/claude-3-opus' or 'meta-llama/llama-3.3-70b-instruct'.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "prompt": {
-                        "type": "string",
-                        "description": "User message with full context and background information",
-                    },
-                    "custom_model": {
-                        "type": "string",
-                        "description": "The exact OpenRouter model code (e.g., 'anthropic/claude-3-opus', 'meta-llama/llama-3.3-70b-instruct'). MUST be the full model identifier as used by OpenRouter. Do NOT use aliases like 'gemini' here - use the 'chat' tool for aliases.",
-                    },
-                    "continuation_id": {
-                        "type": "string",
-                        "description": "Optional UUID of existing conversation to continue. If not provided, a new conversation will be started.",
-                    },
-                    "files": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Absolute paths to files providing context. Essential for accurate responses, especially for code-related queries.",
-                    },
-                    "images": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Absolute paths to images for visual analysis",
-                    },
-                    "max_tokens": {
-                        "type": "integer",
-                        "description": "Optional maximum tokens for the response. If not specified, will use model's default.",
-                    },
-                    "temperature": {
-                        "type": "number",
-                        "description": "Optional temperature for response generation (0.0-2.0). Default is 0.7.",
-                        "minimum": 0.0,
-                        "maximum": 2.0,
-                    },
-                    "thinking_effort": {
-                        "type": "string",
-                        "enum": ["high", "medium", "low"],
-                        "description": "Controls reasoning depth for capable models. Use 'high' for complex problems, 'medium' for standard queries, 'low' for simple tasks.",
-                        "default": "high",
-                    },
+    },
+    {
+        "name": "chat_with_custom_model",
+        "description": "**ADVANCED TOOL - USE ONLY WHEN NEEDED** - Chat with OpenRouter models using exact model codes. WARNING: Only use this tool when you need a specific model code that is NOT available in the standard aliases (gemini, deepseek, kimi, grok, qwen-max, qwen-coder, glm, gpt-5). For 99% of requests, use the 'chat' tool instead. This tool bypasses intelligent model resolution and requires exact OpenRouter model codes like 'anthropic/claude-3-opus' or 'meta-llama/llama-3.3-70b-instruct'.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "prompt": {
+                    "type": "string",
+                    "description": "User message with full context and background information",
+                },
+                "custom_model": {
+                    "type": "string",
+                    "description": "The exact OpenRouter model code (e.g., 'anthropic/claude-3-opus', 'meta-llama/llama-3.3-70b-instruct'). MUST be the full model identifier as used by OpenRouter. Do NOT use aliases like 'gemini' here - use the 'chat' tool for aliases.",
+                },
+                "continuation_id": {
+                    "type": "string",
+                    "description": "Optional UUID of existing conversation to continue. If not provided, a new conversation will be started.",
+                },
+                "files": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Absolute paths to files providing context. Essential for accurate responses, especially for code-related queries.",
+                },
+                "images": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Absolute paths to images for visual analysis",
+                },
+                "max_tokens": {
+                    "type": "integer",
+                    "description": "Optional maximum tokens for the response. If not specified, will use model's default.",
+                },
+                "temperature": {
+                    "type": "number",
+                    "description": "Optional temperature for response generation (0.0-2.0). Default is 0.7.",
+                    "minimum": 0.0,
+                    "maximum": 2.0,
+                },
+                "thinking_effort": {
+                    "type": "string",
+                    "enum": ["high", "medium", "low"],
+                    "description": "Controls reasoning depth for capable models. Use 'high' for complex problems, 'medium' for standard queries, 'low' for simple tasks.",
+                    "default": "high",
                 },
-                "required": ["prompt", "custom_model"],
             },
+            "required": ["prompt", "custom_model"],
         },
-    ]
-    send_response({"jsonrpc": "2.0", "id": req_id, "result": {"tools": tools}})
+    },
+]
+# Serialized once; orjson splices the fragment into each tools/list response
+_TOOLS_RESULT = orjson.Fragment(orjson.dumps({"tools": _TOOLS}))
 
 
-def handle_chat_tool(arguments, req_id):
+async def handle_initialize(params, req_id):
+    """Handle initialize request."""
+    logger.info("Handling initialize request")
+    return {
+        "jsonrpc": "2.0",
+        "id": req_id,
+        "result": {
+            "protocolVersion": "2024-10-07",
+            "capabilities": {"tools": {}},
+            "serverInfo": {"name": "openrouter-simple", "version": "1.0.0"},
+        },
+    }
+
+
+async def handle_tools_list(params, req_id):
+    """Handle tools/list request."""
+    logger.info("Handling tools/list request")
+    return {"jsonrpc": "2.0", "id": req_id, "result": _TOOLS_RESULT}
+
+
+async def handle_chat_tool(arguments, req_id, progress_token=None):
     """Handle chat tool call by deferring to the unified chat handler."""
-    logger.info(f"Handling chat tool: {arguments}")
-    _execute_chat_completion(req_id, arguments, is_custom_model=False)
+    logger.debug("Handling chat tool: %.200s", arguments)
+    return await _execute_chat_completion(
+        req_id, arguments, is_custom_model=False, progress_token=progress_token
+    )
 
 
-def handle_list_conversations(req_id):
+async def handle_list_conversations(arguments, req_id, progress_token=None):
     """Handle list_conversations tool."""
     logger.info("Handling list_conversations tool")
 
     GracefulShutdownProtection.register_request(req_id, "list_conversations")
     try:
+        await _flush_storage_writes()
         conversations = conversation_manager.list_conversations()
         if not conversations:
             result_text = "No conversations found."
         else:
-            result_text = f"Found {len(conversations)} conversations:\n\n"
+            parts = [f"Found {len(conversations)} conversations:\n\n"]
             for conv in conversations:
-                result_text += f"• **ID**: `{conv['id']}`\n"
-                result_text += f"  Messages: {conv['message_count']}\n"
-                result_text += f"  Preview: {conv.get('first_message', 'No messages')[:100]}...\n\n"
-
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "result": {"content": [{"type": "text", "text": result_text}]},
-            }
-        )
+                parts.append(f"• **ID**: `{conv['id']}`\n")
+                parts.append(f"  Messages: {conv['message_count']}\n")
+                preview = conv.get("last_message_preview") or "No messages"
+                parts.append(f"  Preview: {preview[:100]}...\n\n")
+            result_text = "".join(parts)
+
+        return {
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "result": {"content": [{"type": "text", "text": result_text}]},
+        }
 
     except Exception as e:
-        logger.error(f"Error listing conversations: {e}")
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"Error listing conversations: {str(e)}",
-                },
-            }
-        )
+        logger.error("Error listing conversations: %s", e)
+        return _error_response(req_id, -32603, f"Error listing conversations: {str(e)}")
     finally:
         GracefulShutdownProtection.unregister_request(req_id)
 
 
-def handle_get_conversation(arguments, req_id):
+async def handle_get_conversation(arguments, req_id, progress_token=None):
     """Handle get_conversation tool."""
-    logger.info(f"Handling get_conversation tool: {arguments}")
+    logger.info("Handling get_conversation tool: %.200s", arguments)
 
     continuation_id = arguments.get("continuation_id")
     GracefulShutdownProtection.register_request(
@@ -711,54 +1035,36 @@ def handle_get_conversation(arguments, req_id):
 
     try:
         if not continuation_id:
-            send_response(
-                {
-                    "jsonrpc": "2.0",
-                    "id": req_id,
-                    "error": {
-                        "code": -32602,
-                        "message": "Missing required parameter: continuation_id",
-                    },
-                }
+            return _error_response(
+                req_id, -32602, "Missing required parameter: continuation_id"
             )
-            return
+        await _flush_storage_writes(continuation_id)
         history = conversation_manager.get_conversation_history(continuation_id)
         if not history:
             result_text = f"Conversation '{continuation_id}' not found."
         else:
-            result_text = f"**Conversation ID**: `{continuation_id}`\n\n"
-            for i, msg in enumerate(history, 1):
-                role = msg.get("role", "unknown")
-                content = msg.get("content", "")
-                result_text += f"**{i}. {role.title()}**: {content}\n\n"
-
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "result": {"content": [{"type": "text", "text": result_text}]},
-            }
-        )
+            # History entries are built with exactly these two keys
+            result_text = f"**Conversation ID**: `{continuation_id}`\n\n" + "".join(
+                f"**{i}. {msg['role'].title()}**: {msg['content']}\n\n"
+                for i, msg in enumerate(history, 1)
+            )
+
+        return {
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "result": {"content": [{"type": "text", "text": result_text}]},
+        }
 
     except Exception as e:
-        logger.error(f"Error getting conversation: {e}")
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"Error getting conversation: {str(e)}",
-                },
-            }
-        )
+        logger.error("Error getting conversation: %s", e)
+        return _error_response(req_id, -32603, f"Error getting conversation: {str(e)}")
     finally:
         GracefulShutdownProtection.unregister_request(req_id)
 
 
-def handle_delete_conversation(arguments, req_id):
+async def handle_delete_conversation(arguments, req_id, progress_token=None):
     """Handle delete_conversation tool."""
-    logger.info(f"Handling delete_conversation tool: {arguments}")
+    logger.info("Handling delete_conversation tool: %.200s", arguments)
 
     continuation_id = arguments.get("continuation_id")
     GracefulShutdownProtection.register_request(
@@ -767,182 +1073,382 @@ def handle_delete_conversation(arguments, req_id):
 
     try:
         if not continuation_id:
-            send_response(
-                {
-                    "jsonrpc": "2.0",
-                    "id": req_id,
-                    "error": {
-                        "code": -32602,
-                        "message": "Missing required parameter: continuation_id",
-                    },
-                }
+            return _error_response(
+                req_id, -32602, "Missing required parameter: continuation_id"
             )
-            return
+        await _flush_storage_writes(continuation_id)
         success = conversation_manager.delete_conversation(continuation_id)
         if success:
             result_text = f"✅ Conversation '{continuation_id}' deleted successfully."
         else:
             result_text = f"❌ Conversation '{continuation_id}' not found."
 
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "result": {"content": [{"type": "text", "text": result_text}]},
-            }
-        )
+        return {
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "result": {"content": [{"type": "text", "text": result_text}]},
+        }
 
     except Exception as e:
-        logger.error(f"Error deleting conversation: {e}")
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "error": {
-                    "code": -32603,
-                    "message": f"Error deleting conversation: {str(e)}",
-                },
-            }
-        )
+        logger.error("Error deleting conversation: %s", e)
+        return _error_response(req_id, -32603, f"Error deleting conversation: {str(e)}")
     finally:
         GracefulShutdownProtection.unregister_request(req_id)
 
 
-def handle_chat_with_custom_model(arguments, req_id):
+async def handle_chat_with_custom_model(arguments, req_id, progress_token=None):
     """Handle chat_with_custom_model tool call by deferring to the unified chat handler."""
-    logger.info(f"Handling chat_with_custom_model tool: {arguments}")
-    _execute_chat_completion(req_id, arguments, is_custom_model=True)
+    logger.debug("Handling chat_with_custom_model tool: %.200s", arguments)
+    return await _execute_chat_completion(
+        req_id, arguments, is_custom_model=True, progress_token=progress_token
+    )
 
 
-def handle_tools_call(params, req_id):
+async def handle_tools_call(params, req_id):
     """Handle tools/call request."""
     tool_name = params.get("name")
     arguments = params.get("arguments", {})
+    # Clients opt in to streamed output by sending a progress token
+    progress_token = (params.get("_meta") or {}).get("progressToken")
+
+    logger.info("Tool call: %s", tool_name)
+    logger.debug("Tool call arguments: %.200s", arguments)
+
+    handler = _TOOL_HANDLERS.get(tool_name)
+    if handler is None:
+        return _error_response(req_id, -32601, f"Unknown tool: {tool_name}")
+    return await handler(arguments, req_id, progress_token)
+
 
-    logger.info(f"Tool call: {tool_name} with args: {arguments}")
-
-    if tool_name == "chat":
-        handle_chat_tool(arguments, req_id)
-    elif tool_name == "list_conversations":
-        handle_list_conversations(req_id)
-    elif tool_name == "get_conversation":
-        handle_get_conversation(arguments, req_id)
-    elif tool_name == "delete_conversation":
-        handle_delete_conversation(arguments, req_id)
-    elif tool_name == "chat_with_custom_model":
-        handle_chat_with_custom_model(arguments, req_id)
+# tools/call name -> handler(arguments, req_id, progress_token)
+_TOOL_HANDLERS: Dict[str, Callable[..., Awaitable[dict]]] = {
+    "chat": handle_chat_tool,
+    "list_conversations": handle_list_conversations,
+    "get_conversation": handle_get_conversation,
+    "delete_conversation": handle_delete_conversation,
+    "chat_with_custom_model": handle_chat_with_custom_model,
+}
+
+# JSON-RPC method -> handler(params, req_id)
+_METHOD_HANDLERS: Dict[str, Callable[..., Awaitable[dict]]] = {
+    "initialize": handle_initialize,
+    "tools/list": handle_tools_list,
+    "tools/call": handle_tools_call,
+}
+
+
+class _BlockingStdout:
+    """StreamWriter stand-in used when stdout is a regular file, not a pipe."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, data: bytes):
+        self._stream.write(data)
+        self._stream.flush()
+
+    async def drain(self):
+        pass
+
+    def is_closing(self) -> bool:
+        return self._stream.closed
+
+
+async def _feed_reader(reader: asyncio.StreamReader, stream):
+    """Copy a non-pipe stdin (e.g. a redirected file) into the stream reader."""
+    while not shutdown_requested:
+        chunk = await asyncio.to_thread(stream.read1, 65536)
+        if not chunk:
+            break
+        reader.feed_data(chunk)
+    reader.feed_eof()
+
+
+async def _connect_stdio() -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Attach stdin and stdout to the running event loop.
+
+    Pipes and ttys are driven by the event loop directly, which switches those
+    file descriptors to non-blocking mode. Regular files (``< msgs.jsonl``,
+    ``> out``) cannot be, so they fall back to blocking reads and writes.
+    """
+    global _stdin_feeder
+    loop = asyncio.get_running_loop()
+
+    reader = asyncio.StreamReader(limit=MAX_MESSAGE_SIZE)
+    try:
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+        )
+    except ValueError:
+        logger.info("stdin is not a pipe, reading it with blocking I/O")
+        _stdin_feeder = asyncio.create_task(_feed_reader(reader, sys.stdin.buffer))
+
+    try:
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, sys.stdout
+        )
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    except ValueError:
+        logger.info("stdout is not a pipe, writing it with blocking I/O")
+        writer = _BlockingStdout(sys.stdout.buffer)
+
+    # stdout now carries only JSON-RPC frames; a stray print() from here on must
+    # neither corrupt the stream nor hit the non-blocking descriptor
+    sys.stdout = sys.stderr
+    return reader, writer
+
+
+def _restore_blocking_stdio():
+    """Hand stdin/stdout back in blocking mode, as other processes expect."""
+    for stream in (sys.__stdin__, sys.__stdout__):
+        try:
+            os.set_blocking(stream.fileno(), True)
+        except (OSError, ValueError):
+            pass
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Read one newline-delimited message.
+
+    Returns b"" on EOF, or None when the line exceeded MAX_MESSAGE_SIZE; the
+    whole oversized line is discarded so its tail is not parsed as a message.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        overrun = e.consumed
+
+    while True:
+        try:
+            await reader.readexactly(overrun)
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.LimitOverrunError as e:
+            overrun = e.consumed
+        except asyncio.IncompleteReadError:
+            return None
+
+
+async def _handle_message(message: dict) -> Optional[dict]:
+    """Route one JSON-RPC message to its handler and return the response, if any."""
+    try:
+        method = message.get("method")
+        params = message.get("params", {})
+        req_id = message.get("id")
+
+        logger.info("Processing method: %s, id: %s", method, req_id)
+
+        # Handle notifications (no response needed)
+        if req_id is None:
+            logger.info("Notification received, no response needed")
+            return None
+
+        handler = _METHOD_HANDLERS.get(method)
+        if handler is None:
+            return _error_response(req_id, -32601, f"Method not found: {method}")
+        return await handler(params, req_id)
+    except Exception as e:
+        logger.error("Error handling message: %s", e)
+        return None
+
+
+async def _handle_batch(messages: list) -> list:
+    """Handle a JSON-RPC batch concurrently; notifications add no entry."""
+
+    async def handle_one(message):
+        if not isinstance(message, dict):
+            return _error_response(None, -32600, "Invalid Request")
+        return await _handle_message(message)
+
+    responses = await asyncio.gather(*(handle_one(m) for m in messages))
+    return [r for r in responses if r is not None]
+
+
+async def _dispatch(message):
+    """Handle one JSON-RPC message or batch and write its response."""
+    if message == []:
+        # An empty batch is answered with a single error, not an array
+        response = _error_response(None, -32600, "Invalid Request: empty batch")
+    elif isinstance(message, list):
+        response = await _handle_batch(message)
     else:
-        send_response(
-            {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "error": {"code": -32601, "message": f"Unknown tool: {tool_name}"},
-            }
+        response = await _handle_message(message)
+    if response:
+        await send_response(response)
+
+
+def _is_tool_call(message) -> bool:
+    """Tool calls can run for minutes, so only they count against the in-flight limit
+
+    A batch containing tool calls holds a single slot until its whole response
+    is written.
+    """
+    if isinstance(message, list):
+        return any(_is_tool_call(m) for m in message)
+    return (
+        isinstance(message, dict)
+        and message.get("method") == "tools/call"
+        and message.get("id") is not None
+    )
+
+
+def _on_shutdown_signal(
+    signum: int, reader: asyncio.StreamReader, stopping: asyncio.Event
+):
+    """Stop reading new requests; main() then drains the ones in flight"""
+    logger.info(
+        "PROTECTION: Received signal %s, initiating graceful shutdown...", signum
+    )
+    GracefulShutdownProtection.request_shutdown(
+        f"Shutdown requested by signal {signum}"
+    )
+    # Wake the pending readline(), or a wait for a request slot, so the main
+    # loop reaches its drain step
+    reader.feed_eof()
+    stopping.set()
+
+
+async def _acquire_slot(slots: asyncio.Semaphore, stopping: asyncio.Event) -> bool:
+    """Wait for a request slot; False if shutdown started first"""
+    if not slots.locked():
+        await slots.acquire()
+        return True
+
+    acquire = asyncio.ensure_future(slots.acquire())
+    stopped = asyncio.ensure_future(stopping.wait())
+    done, _ = await asyncio.wait(
+        (acquire, stopped), return_when=asyncio.FIRST_COMPLETED
+    )
+    stopped.cancel()
+    if acquire in done:
+        return True
+    acquire.cancel()
+    return False
+
+
+async def _drain_requests(pending: Set[asyncio.Task]):
+    """Let accepted requests finish within the grace period, then cancel the rest"""
+    if not pending:
+        return
+
+    logger.info(
+        "PROTECTION: Waiting for %d in-flight requests to complete...", len(pending)
+    )
+    _, unfinished = await asyncio.wait(set(pending), timeout=SHUTDOWN_GRACE_PERIOD)
+    if unfinished:
+        logger.warning(
+            "PROTECTION: Cancelling %d requests still active after %ss",
+            len(unfinished),
+            SHUTDOWN_GRACE_PERIOD,
         )
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+
+
+async def main():
+    """Main asyncio loop with graceful shutdown protection.
 
+    Each request runs as its own task so a slow chat completion does not hold
+    up later requests; responses carry their id, so they may arrive out of order.
+    """
+    global _stdout, _http_client, _openrouter_slots, _write_slots
 
-def main():
-    """Main synchronous loop with graceful shutdown protection."""
     logger.info("Starting main loop, reading from stdin...")
+    _http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        headers={
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "HTTP-Referer": "https://claude.ai",
+            "X-Title": "OpenRouter MCP Server",
+        },
+    )
+    _openrouter_slots = asyncio.Semaphore(OPENROUTER_MAX_CONCURRENCY)
+    _write_slots = asyncio.Semaphore(WRITE_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+    reader, _stdout = await _connect_stdio()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, _on_shutdown_signal, signum, reader, stopping)
 
-    # Track consecutive EOF reads to detect client disconnect
-    eof_count = 0
-    max_eof_retries = 5
+    inflight = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    pending: Set[asyncio.Task] = set()
 
     try:
         while not shutdown_requested:
             try:
-                # Check if stdin is closed (client disconnected)
-                if sys.stdin.closed:
-                    logger.warning("PROTECTION: stdin closed, client disconnected")
-                    GracefulShutdownProtection.handle_shutdown()
-                    break
-
-                line = sys.stdin.readline()
-                if not line:
-                    eof_count += 1
-                    if eof_count >= max_eof_retries:
-                        logger.warning(
-                            f"PROTECTION: Received {eof_count} consecutive EOFs, client likely disconnected"
-                        )
-                        GracefulShutdownProtection.handle_shutdown()
-                        break
-                    else:
-                        logger.debug(
-                            f"EOF received ({eof_count}/{max_eof_retries}), waiting for more input..."
+                line = await _read_message(reader)
+                if line is None:
+                    logger.error("Dropping message larger than MAX_MESSAGE_SIZE")
+                    await send_response(
+                        _error_response(
+                            None,
+                            -32600,
+                            f"Invalid Request: message exceeds {MAX_MESSAGE_SIZE} bytes",
                         )
-                        time.sleep(1.0)
-                        continue
-
-                # Reset EOF counter on successful read
-                eof_count = 0
+                    )
+                    continue
+                if not line:
+                    # The pipe reader only reports EOF once the client has closed
+                    # stdin, or once a shutdown signal has woken it up
+                    if not shutdown_requested:
+                        logger.warning("PROTECTION: stdin closed, client disconnected")
+                    break
 
                 line = line.strip()
                 if not line:
                     continue
 
-                logger.info(f"Received: {line}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Received: %.200s", line.decode("utf-8", "replace"))
 
                 try:
-                    message = json.loads(line)
-                    method = message.get("method")
-                    params = message.get("params", {})
-                    req_id = message.get("id")
-
-                    logger.info(f"Processing method: {method}, id: {req_id}")
-
-                    # Handle notifications (no response needed)
-                    if req_id is None:
-                        logger.info("Notification received, no response needed")
-                        continue
-
-                    # Handle requests
-                    if method == "initialize":
-                        handle_initialize(req_id)
-                    elif method == "tools/list":
-                        handle_tools_list(req_id)
-                    elif method == "tools/call":
-                        handle_tools_call(params, req_id)
-                    else:
-                        send_response(
-                            {
-                                "jsonrpc": "2.0",
-                                "id": req_id,
-                                "error": {
-                                    "code": -32601,
-                                    "message": f"Method not found: {method}",
-                                },
-                            }
+                    message = orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    logger.error("JSON decode error: %s", e)
+                    continue
+
+                # Hold a slot before accepting another tool call, so reading
+                # pauses (backpressure) instead of queueing unbounded work
+                needs_slot = _is_tool_call(message)
+                if needs_slot and not await _acquire_slot(inflight, stopping):
+                    await send_response(
+                        _error_response(
+                            message.get("id"),
+                            -32000,
+                            "Server shutting down, request rejected",
                         )
+                    )
+                    break
 
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON decode error: {e}")
+                task = asyncio.create_task(_dispatch(message))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                if needs_slot:
+                    task.add_done_callback(lambda _: inflight.release())
 
-            except BrokenPipeError:
+            except (BrokenPipeError, ConnectionResetError):
                 logger.warning("PROTECTION: Broken pipe detected, client disconnected")
-                GracefulShutdownProtection.handle_shutdown()
                 break
-            except OSError as e:
-                if e.errno == 32:  # Broken pipe
-                    logger.warning(
-                        "PROTECTION: Broken pipe (OSError 32), client disconnected"
-                    )
-                    GracefulShutdownProtection.handle_shutdown()
-                    break
-                else:
-                    logger.error(f"OSError in main loop: {e}")
             except Exception as e:
-                logger.error(f"Error in main loop: {e}")
+                logger.error("Error in main loop: %s", e)
 
-    except KeyboardInterrupt:
-        logger.info("PROTECTION: KeyboardInterrupt received")
-        GracefulShutdownProtection.handle_shutdown()
     except Exception as e:
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
+    finally:
+        # Requests already accepted are answered before shutdown is flagged
+        await _drain_requests(pending)
         GracefulShutdownProtection.handle_shutdown()
+        # Persist everything the drained requests queued before exiting
+        await _flush_storage_writes()
+        await _http_client.aclose()
+        _restore_blocking_stdio()
 
     logger.info("PROTECTION: Main loop exited, server shutdown complete")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())